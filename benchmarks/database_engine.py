@@ -0,0 +1,140 @@
+"""
+数据库引擎配置基准测试
+
+在临时 SQLite 文件上对比 SQLAlchemy 默认引擎（`journal_mode=delete`、
+`synchronous=full`）与 `EngineProfile` 默认配置创建的引擎:
+
+- read: 多个协程并发按主键查询，每 `--write-every` 次查询夹带一次更新
+- write: 多个协程并发执行单行写入事务
+
+每个场景输出吞吐量与单次操作的 p50/p99 耗时:
+
+    python benchmarks/database_engine.py --ops 2000 --concurrency 8
+"""
+
+import random
+import asyncio
+import argparse
+import importlib.util
+from pathlib import Path
+from time import perf_counter
+from tempfile import TemporaryDirectory
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from status_suite import percentile
+
+ROOT = Path(__file__).parent.parent
+ROWS = 10000
+
+
+def load_engine_module():
+    """直接加载 `engine.py`，避免为基准测试启动整个 Entari 应用"""
+    path = ROOT / "miraita" / "databases" / "engine.py"
+    spec = importlib.util.spec_from_file_location("_database_engine", path)
+    module = importlib.util.module_from_spec(spec)  # type: ignore
+    spec.loader.exec_module(module)  # type: ignore
+    return module
+
+
+async def prepare(engine: AsyncEngine) -> None:
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(
+                "CREATE TABLE bind (platform VARCHAR(32), platform_id VARCHAR(64), "
+                "bind_id INTEGER, PRIMARY KEY (platform, platform_id))"
+            )
+        )
+        await conn.execute(
+            text("INSERT INTO bind VALUES ('qq', :id, :bind_id)"),
+            [{"id": str(i), "bind_id": i} for i in range(ROWS)],
+        )
+
+
+async def read(engine: AsyncEngine, i: int, write_every: int) -> None:
+    platform_id = str(random.randrange(ROWS))
+    async with engine.begin() as conn:
+        if write_every and i % write_every == 0:
+            await conn.execute(
+                text("UPDATE bind SET bind_id = :i WHERE platform_id = :id"),
+                {"i": i, "id": platform_id},
+            )
+        else:
+            await conn.execute(
+                text(
+                    "SELECT bind_id FROM bind "
+                    "WHERE platform = 'qq' AND platform_id = :id"
+                ),
+                {"id": platform_id},
+            )
+
+
+async def write(engine: AsyncEngine, i: int, write_every: int) -> None:
+    async with engine.begin() as conn:
+        await conn.execute(
+            text("INSERT INTO bind VALUES ('tg', :id, :i)"), {"id": str(i), "i": i}
+        )
+
+
+async def run(
+    engine: AsyncEngine, workload, ops: int, concurrency: int, write_every: int
+):
+    timings: list[float] = []
+    counter = iter(range(ops))
+
+    async def worker():
+        for i in counter:
+            start = perf_counter()
+            await workload(engine, i, write_every)
+            timings.append((perf_counter() - start) * 1000)
+
+    start = perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = perf_counter() - start
+    return {
+        "ops_per_s": ops / elapsed,
+        "p50_ms": percentile(timings, 50),
+        "p99_ms": percentile(timings, 99),
+    }
+
+
+async def bench(args) -> None:
+    engine_module = load_engine_module()
+    profiles = {
+        "default": lambda url: create_async_engine(url),
+        "tuned": lambda url: engine_module.create_engine(
+            url, engine_module.EngineProfile()
+        ),
+    }
+    with TemporaryDirectory() as tmp:
+        for name, factory in profiles.items():
+            for workload in (read, write):
+                url = f"sqlite+aiosqlite:///{tmp}/{name}-{workload.__name__}.db"
+                engine = factory(url)
+                await prepare(engine)
+                result = await run(
+                    engine, workload, args.ops, args.concurrency, args.write_every
+                )
+                await engine.dispose()
+                print(  # noqa: T201
+                    f"{workload.__name__:<6} {name:<8}: "
+                    f"{result['ops_per_s']:>9.1f} ops/s  "
+                    f"p50 {result['p50_ms']:>7.2f} ms  p99 {result['p99_ms']:>7.2f} ms"
+                )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--ops", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument(
+        "--write-every", type=int, default=20, help="read 场景中每 N 次操作写入一次"
+    )
+    args = parser.parse_args()
+    random.seed(0)
+    asyncio.run(bench(args))
+
+
+if __name__ == "__main__":
+    main()
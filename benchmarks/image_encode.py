@@ -0,0 +1,73 @@
+"""
+生成图片编码基准测试
+
+渲染一张状态图，按不同的编码参数分别编码，输出编码耗时中位数与输出大小:
+
+    python benchmarks/image_encode.py --rounds 10 --max-width 720
+"""
+
+import argparse
+import importlib.util
+from statistics import median
+from time import perf_counter
+
+from status_render import ROOT, make_inputs, make_renderer, load_render_module
+
+
+def load_image_module():
+    """直接加载 `miraita/utils/image.py`，避免导入 `miraita` 时加载所有插件"""
+    path = ROOT / "miraita" / "utils" / "image.py"
+    spec = importlib.util.spec_from_file_location("_image", path)
+    module = importlib.util.module_from_spec(spec)  # type: ignore
+    spec.loader.exec_module(module)  # type: ignore
+    return module
+
+
+def make_modes(image, max_width: int) -> dict[str, object]:
+    options = image.EncodeOptions
+    modes = {
+        "png (level 6)": options("png"),
+        "png (level 1)": options("png", compress_level=1),
+        "palette png": options("palette"),
+        "palette png (level 1)": options("palette", compress_level=1),
+        "webp q85": options("webp"),
+        "webp q85 m0": options("webp", method=0),
+        "webp lossless m0": options("webp_lossless", method=0, quality=0),
+        "jpeg q85": options("jpeg"),
+    }
+    if max_width:
+        modes |= {
+            f"{name} @{max_width}w": options(
+                mode.format,
+                compress_level=mode.compress_level,
+                quality=mode.quality,
+                method=mode.method,
+                max_width=max_width,
+            )
+            for name, mode in list(modes.items())
+        }
+    return modes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--max-width", type=int, default=720)
+    args = parser.parse_args()
+
+    render = load_render_module()
+    image = load_image_module()
+    canvas = make_renderer(render).render(*make_inputs(render, 0))
+    print(f"rounds: {args.rounds}, size: {canvas.width}x{canvas.height}")  # noqa: T201
+    for name, options in make_modes(image, args.max_width).items():
+        timings: list[float] = []
+        for _ in range(args.rounds):
+            start = perf_counter()
+            encoded = image.encode_image(canvas, options)
+            timings.append((perf_counter() - start) * 1000)
+        size = len(encoded.data) / 1024
+        print(f"{name:<28} {median(timings):>8.2f} ms  {size:>8.1f} KiB")  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
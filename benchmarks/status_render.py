@@ -0,0 +1,117 @@
+"""
+状态图分层渲染基准测试
+
+对比每次都重新合成静态层（原先的做法）与复用缓存静态层时，单次渲染的耗时、
+Pillow 分配的图像内存块数量（像素数据不经过 tracemalloc）与 Python 堆分配峰值:
+
+    python benchmarks/status_render.py --rounds 20
+"""
+
+import argparse
+import tracemalloc
+import importlib.util
+from pathlib import Path
+from io import BytesIO
+from statistics import median
+from time import perf_counter
+
+from PIL import Image
+
+ROOT = Path(__file__).parent.parent
+RESOURCE_DIR = ROOT / ".miraita" / "resources"
+
+
+def load_render_module():
+    """直接加载 `render.py`，避免为基准测试启动整个 Entari 应用"""
+    path = ROOT / "miraita" / "plugins" / "status" / "render.py"
+    spec = importlib.util.spec_from_file_location("_status_render", path)
+    module = importlib.util.module_from_spec(spec)  # type: ignore
+    spec.loader.exec_module(module)  # type: ignore
+    return module
+
+
+def make_renderer(render):
+    fonts = RESOURCE_DIR / "fonts" / "status"
+    images = RESOURCE_DIR / "images" / "status"
+    nickname_font = fonts / "baotu.ttf"
+    if not nickname_font.exists():
+        # 仓库中没有附带 baotu.ttf，缺失时用其他字体代替，不影响对比
+        nickname_font = fonts / "SpicyRice-Regular.ttf"
+    theme = render.Theme(
+        background=images / "background.png",
+        marker=images / "badge.png",
+        nickname_font=nickname_font,
+        value_font=fonts / "SpicyRice-Regular.ttf",
+        details_font=fonts / "ADLaMDisplay-Regular.ttf",
+        cpu_color=(84, 173, 255, 255),
+        ram_color=(255, 179, 204, 255),
+        swap_color=(251, 170, 147, 255),
+        disk_color=(184, 170, 159, 255),
+        details_color=(184, 170, 159, 255),
+        nickname_color=(84, 173, 255, 255),
+    )
+    return render.StatusRenderer(theme)
+
+
+def make_inputs(render, i: int):
+    static = render.StaticInfo(
+        nickname="Miraita",
+        cpu_brand="AMD Ryzen 9 7950X 16-Core Processor",
+        system="Linux 6.8.0",
+        version="Entari 0.16.5 x Miraita 0.1.0",
+        plugins=12,
+    )
+    usage = (i % 100) / 100
+    dynamic = render.DynamicInfo(
+        cpu=render.Gauge(usage, f"{usage * 100:.1f}% - 4.5Ghz [16 core]"),
+        ram=render.Gauge(0.4, "12.7 / 31.2 GB"),
+        swap=render.Gauge(None, "0.0 / 0.0 GB"),
+        disk=render.Gauge(0.25, "123.4 / 500.0 GB"),
+        runtime=f"1 day, 2:03:{i % 60:02d}",
+    )
+    return static, dynamic
+
+
+def bench(render, renderer, rounds: int, cached: bool, encode: bool):
+    """返回 (耗时中位数 ms, 每次渲染分配的图像内存块数, Python 堆分配峰值 KiB)"""
+    timings: list[float] = []
+    peaks: list[int] = []
+    renderer.render(*make_inputs(render, 0))
+    blocks = Image.core.get_stats()["allocated_blocks"]
+    for i in range(rounds):
+        static, dynamic = make_inputs(render, i)
+        if not cached:
+            renderer.invalidate()
+        tracemalloc.start()
+        start = perf_counter()
+        image = renderer.render(static, dynamic)
+        if encode:
+            image.save(BytesIO(), format="png")
+        timings.append((perf_counter() - start) * 1000)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    blocks = (Image.core.get_stats()["allocated_blocks"] - blocks) / rounds
+    return median(timings), blocks, max(peaks) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    render = load_render_module()
+    renderer = make_renderer(render)
+    print(f"rounds: {args.rounds}")  # noqa: T201
+    for encode in (False, True):
+        label = "render + png" if encode else "render only"
+        full = bench(render, renderer, args.rounds, cached=False, encode=encode)
+        layered = bench(render, renderer, args.rounds, cached=True, encode=encode)
+        for name, (ms, blocks, peak) in (("full", full), ("layered", layered)):
+            print(  # noqa: T201
+                f"{label:<13} {name:<8}: {ms:>8.2f} ms  "
+                f"{blocks:>5.1f} image blocks  peak {peak:>8.1f} KiB"
+            )
+
+
+if __name__ == "__main__":
+    main()
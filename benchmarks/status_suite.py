@@ -0,0 +1,253 @@
+"""
+状态图渲染基准测试套件
+
+使用运行时生成的合成素材（渐变噪点背景、徽章与 Pillow 内置字体），
+不依赖 `RESOURCE_DIR` 中的真实素材，按与 `drawer.draw` 相同的流程
+（`StatusRenderer.render` + `encode_image`）渲染并编码状态图:
+
+- cold: 每次渲染都新建渲染器，包含字体加载与静态层合成
+- warm: 复用同一个渲染器，静态层已缓存
+- concurrent: 多个线程同时渲染与编码
+
+每个场景输出 p50/p99 耗时、Python 堆分配峰值、Pillow 图像内存块数与输出大小，
+结果可保存为 JSON 并与其他提交的结果对比:
+
+    python benchmarks/status_suite.py --output before.json
+    python benchmarks/status_suite.py --compare before.json --threshold 10
+"""
+
+import sys
+import json
+import random
+import argparse
+import platform
+import subprocess
+import tracemalloc
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from concurrent.futures import ThreadPoolExecutor
+
+import PIL
+from PIL import Image, ImageDraw, ImageFont
+
+from image_encode import load_image_module
+from status_render import ROOT, make_inputs, load_render_module
+
+COMPARED_METRICS = ("p50_ms", "p99_ms", "peak_kib", "bytes")
+
+
+def make_assets(directory: Path, seed: int = 0) -> dict[str, Path]:
+    """生成与真实素材尺寸一致的背景、徽章，并导出 Pillow 内置字体"""
+    rng = random.Random(seed)
+    width, height = 1080, 1814
+    background = Image.linear_gradient("L").resize((width, height))
+    background = Image.merge(
+        "RGB",
+        (background, background.transpose(Image.Transpose.ROTATE_180), background),
+    )
+    draw = ImageDraw.Draw(background)
+    for _ in range(400):
+        x, y = rng.randrange(width), rng.randrange(height)
+        r = rng.randrange(4, 40)
+        color = tuple(rng.randrange(256) for _ in range(3))
+        draw.ellipse((x - r, y - r, x + r, y + r), fill=color)
+    background.save(directory / "background.png")
+
+    badge = Image.new("RGBA", (120, 48), (0, 0, 0, 0))
+    ImageDraw.Draw(badge).rounded_rectangle(
+        (0, 0, 119, 47), radius=16, fill=(84, 173, 255, 255)
+    )
+    badge.save(directory / "badge.png")
+
+    font = ImageFont.load_default(36)
+    font_path = directory / "default.ttf"
+    font_path.write_bytes(font.path.getvalue())  # type: ignore
+    return {
+        "background": directory / "background.png",
+        "marker": directory / "badge.png",
+        "font": font_path,
+    }
+
+
+def make_theme(render, assets: dict[str, Path]):
+    return render.Theme(
+        background=assets["background"],
+        marker=assets["marker"],
+        nickname_font=assets["font"],
+        value_font=assets["font"],
+        details_font=assets["font"],
+        cpu_color=(84, 173, 255, 255),
+        ram_color=(255, 179, 204, 255),
+        swap_color=(251, 170, 147, 255),
+        disk_color=(184, 170, 159, 255),
+        details_color=(184, 170, 159, 255),
+        nickname_color=(84, 173, 255, 255),
+    )
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """最近秩法计算百分位数"""
+    ordered = sorted(values)
+    index = max(int(round(pct / 100 * len(ordered))) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+class Suite:
+    def __init__(self, rounds: int, workers: int, options):
+        self.render = load_render_module()
+        self.image = load_image_module()
+        self.rounds = rounds
+        self.workers = workers
+        self.options = options
+        self._tmp = TemporaryDirectory()
+        self.theme = make_theme(self.render, make_assets(Path(self._tmp.name)))
+
+    def close(self) -> None:
+        self._tmp.cleanup()
+
+    def draw(self, renderer, i: int) -> bytes:
+        """与 `drawer.draw` 相同的渲染与编码流程"""
+        static, dynamic = make_inputs(self.render, i)
+        return self.image.encode_image(
+            renderer.render(static, dynamic), self.options
+        ).data
+
+    def measure(self, call) -> dict[str, float]:
+        """先逐次计时，再单独开启 tracemalloc 测一次内存，避免追踪开销影响耗时"""
+        timings: list[float] = []
+        blocks = Image.core.get_stats()["allocated_blocks"]
+        for i in range(self.rounds):
+            start = perf_counter()
+            data = call(i)
+            timings.append((perf_counter() - start) * 1000)
+        blocks = (Image.core.get_stats()["allocated_blocks"] - blocks) / self.rounds
+
+        tracemalloc.start()
+        call(self.rounds)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return {
+            "p50_ms": percentile(timings, 50),
+            "p99_ms": percentile(timings, 99),
+            "mean_ms": sum(timings) / len(timings),
+            "peak_kib": peak / 1024,
+            "image_blocks": blocks,
+            "bytes": len(data),
+        }
+
+    def cold(self) -> dict[str, float]:
+        return self.measure(
+            lambda i: self.draw(self.render.StatusRenderer(self.theme), i)
+        )
+
+    def warm(self) -> dict[str, float]:
+        renderer = self.render.StatusRenderer(self.theme)
+        self.draw(renderer, 0)
+        return self.measure(lambda i: self.draw(renderer, i))
+
+    def concurrent(self) -> dict[str, float]:
+        renderer = self.render.StatusRenderer(self.theme)
+        self.draw(renderer, 0)
+
+        def timed(i: int) -> tuple[float, int]:
+            start = perf_counter()
+            size = len(self.draw(renderer, i))
+            return (perf_counter() - start) * 1000, size
+
+        with ThreadPoolExecutor(self.workers) as executor:
+            start = perf_counter()
+            results = list(executor.map(timed, range(self.rounds)))
+            elapsed = perf_counter() - start
+        timings = [ms for ms, _ in results]
+        return {
+            "p50_ms": percentile(timings, 50),
+            "p99_ms": percentile(timings, 99),
+            "mean_ms": sum(timings) / len(timings),
+            "throughput": self.rounds / elapsed,
+            "bytes": results[-1][1],
+        }
+
+    def run(self) -> dict[str, dict[str, float]]:
+        return {
+            "cold": self.cold(),
+            "warm": self.warm(),
+            "concurrent": self.concurrent(),
+        }
+
+
+def git_revision() -> str | None:
+    try:
+        output = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.stdout.strip()
+
+
+def compare(old: dict, new: dict, threshold: float) -> bool:
+    """打印与 `old` 的对比，任一耗时指标变慢超过 `threshold`% 时返回 `False`"""
+    ok = True
+    print(f"\ncompared with {old['meta'].get('revision')}:")  # noqa: T201
+    for scenario, metrics in new["results"].items():
+        before = old["results"].get(scenario, {})
+        for name in COMPARED_METRICS:
+            if name not in metrics or not before.get(name):
+                continue
+            change = (metrics[name] - before[name]) / before[name] * 100
+            flag = ""
+            if name.endswith("_ms") and change > threshold:
+                flag, ok = "  <- regression", False
+            print(  # noqa: T201
+                f"{scenario:<11} {name:<9} {before[name]:>10.2f} -> "
+                f"{metrics[name]:>10.2f} ({change:+6.1f}%){flag}"
+            )
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--format", default="png", help="编码格式，见 EncodeOptions")
+    parser.add_argument("--output", type=Path, help="将结果保存为 JSON")
+    parser.add_argument("--compare", type=Path, help="与之前保存的 JSON 结果对比")
+    parser.add_argument(
+        "--threshold", type=float, default=10, help="耗时变慢超过该百分比时返回非零"
+    )
+    args = parser.parse_args()
+
+    image = load_image_module()
+    suite = Suite(args.rounds, args.workers, image.EncodeOptions(args.format))
+    try:
+        results = suite.run()
+    finally:
+        suite.close()
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "pillow": PIL.__version__,
+            "format": args.format,
+            "rounds": args.rounds,
+            "workers": args.workers,
+        },
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))  # noqa: T201
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+    if args.compare and not compare(
+        json.loads(args.compare.read_text()), report, args.threshold
+    ):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,226 @@
+from typing import Any
+from collections.abc import Callable, Sequence
+
 from arclet.entari import keeping
-from fastapi import APIRouter, Response
-from prometheus_client import generate_latest, REGISTRY, CONTENT_TYPE_LATEST
+from fastapi import APIRouter, Query, Request, Response
+from prometheus_client import REGISTRY
+from prometheus_client.samples import Sample
 
-from miraita.plugins.prometheus import Counter  # entari: plugin
+from miraita.apis.schemas import GenericResponse
+from miraita.plugins.prometheus import (  # entari: plugin
+    Counter,
+    collect_metrics,
+    promql,
+    render_exposition,
+)
+from miraita.plugins.prometheus.registry import MetricFamily
 
 router = APIRouter(tags=["Metrics"])
 
+PAGE_LIMIT = 1000
+"""单页最多返回的条数"""
+
+SAMPLE_FIELDS: dict[str, Callable[[Sample], Any]] = {
+    "name": lambda s: s.name,
+    "labels": lambda s: s.labels,
+    "value": lambda s: s.value,
+    "timestamp": lambda s: float(s.timestamp) if s.timestamp is not None else None,
+}
+FAMILY_FIELDS = ("name", "type", "help", "samples")
+SUMMARY_FIELDS = ("name", "type", "help", "sample_count")
+
 metrics_request_counter = keeping(
     "metrics_request_counter",
     obj_factory=lambda: Counter("miraita_metrics_requests", "Total number of requests"),
     dispose=lambda counter: REGISTRY.unregister(counter),
 )
 
+metrics_query_counter = keeping(
+    "metrics_query_counter",
+    obj_factory=lambda: Counter(
+        "miraita_metrics_queries",
+        "Total number of JSON metric queries by endpoint",
+        ["endpoint"],
+    ),
+    dispose=lambda counter: REGISTRY.unregister(counter),
+)
+
 
 @router.get("/")
-async def prometheus() -> Response:
+async def prometheus(request: Request) -> Response:
     """Prometheus metrics endpoint."""
     metrics_request_counter.inc()
-    return Response(
-        generate_latest(),
-        status_code=200,
-        headers={"Content-Type": CONTENT_TYPE_LATEST},
+    content, headers = await render_exposition(
+        request.headers.get("Accept"), request.headers.get("Accept-Encoding")
+    )
+    return Response(content, status_code=200, headers=headers)
+
+
+def _parse_fields(fields: str | None, allowed: Sequence[str]) -> list[str]:
+    """解析逗号分隔的 `fields` 参数，未指定时返回全部字段"""
+    if not fields:
+        return list(allowed)
+    selected = [field.strip() for field in fields.split(",") if field.strip()]
+    if unknown := [field for field in selected if field not in allowed]:
+        raise ValueError(
+            f"unknown fields {', '.join(unknown)}, expected any of {', '.join(allowed)}"
+        )
+    return selected
+
+
+def _sample(sample: Sample, fields: list[str]) -> dict[str, Any]:
+    return {field: SAMPLE_FIELDS[field](sample) for field in fields}
+
+
+def _parse_selector(match: str) -> promql.VectorSelector:
+    """
+    解析 `name{label="value"}` 形式的选择器，指标名称必填
+
+    接口无需鉴权，正则匹配在事件循环中逐个样本执行，因此不支持 `=~` 与 `!~`
+    """
+    selector = promql.parse(match.strip())
+    if not isinstance(selector, promql.VectorSelector):
+        raise promql.QueryError("only vector selectors such as name{...} are supported")
+    if not selector.name:
+        raise promql.QueryError("a metric name is required")
+    if regex := [m.name for m in selector.matchers if m.regex is not None]:
+        raise promql.QueryError(
+            f"regex matchers are not supported, found on {', '.join(regex)}"
+        )
+    return selector
+
+
+def _filter_samples(fam: MetricFamily, selector: promql.VectorSelector) -> list[Sample]:
+    """先用等值匹配走标签索引，再逐个检查其余匹配器"""
+    others = [m for m in selector.matchers if not (m.op == "=" and m.value)]
+    return [
+        s
+        for s in fam.filter_samples(selector.equalities)
+        if all(
+            m.matches({"__name__": s.name, **s.labels}.get(m.name, "")) for m in others
+        )
+    ]
+
+
+def _error(response: Response, code: int, message: str) -> GenericResponse:
+    response.status_code = code
+    return GenericResponse(success=False, code=code, message=message)
+
+
+def _page(items: list, offset: int, limit: int, coll) -> tuple[list, dict[str, Any]]:
+    """截取一页，返回该页与分页及快照信息"""
+    return items[offset : offset + limit], {
+        "total": len(items),
+        "offset": offset,
+        "limit": limit,
+        "version": coll.version,
+        "age": coll.age,
+    }
+
+
+@router.get("/query")
+async def query_metrics(
+    response: Response,
+    match: str,
+    type: str | None = None,
+    fields: str | None = None,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=PAGE_LIMIT),
+) -> GenericResponse[dict[str, Any]]:
+    """
+    Metric families matching a selector such as `name{label="value"}`.
+
+    The metric name is required and label matchers may use `=` and `!=`;
+    regex matchers are rejected. Only samples matching the label matchers are
+    returned; with label matchers, families without any matching sample are
+    skipped. `fields` selects the family fields to return.
+    """
+    metrics_query_counter.labels("query").inc()
+    try:
+        selected = _parse_fields(fields, FAMILY_FIELDS)
+        selector = _parse_selector(match)
+    except ValueError as e:
+        return _error(response, 400, str(e))
+    coll = collect_metrics()
+    if coll.error:
+        return _error(response, 500, coll.error)
+
+    matched = [
+        (fam, samples)
+        for fam in coll.find_by_name(selector.name)  # type: ignore
+        if (type is None or fam.type == type)
+        and ((samples := _filter_samples(fam, selector)) or not selector.matchers)
+    ]
+    page, meta = _page(matched, offset, limit, coll)
+    families = []
+    for fam, samples in page:
+        item = {field: getattr(fam, field) for field in selected if field != "samples"}
+        if "samples" in selected:
+            item["samples"] = [_sample(s, list(SAMPLE_FIELDS)) for s in samples]
+        families.append(item)
+    return GenericResponse(success=True, data={"metrics": families, **meta})
+
+
+@router.get("/series")
+async def query_series(
+    response: Response,
+    match: str,
+    fields: str | None = None,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=PAGE_LIMIT),
+) -> GenericResponse[dict[str, Any]]:
+    """
+    Individual samples matching a selector, with the same syntax as `/query`.
+
+    A sample name such as `xxx_total` only returns that series; a family name
+    returns every sample of the family. `fields` selects the sample fields.
+    """
+    metrics_query_counter.labels("series").inc()
+    try:
+        selected = _parse_fields(fields, tuple(SAMPLE_FIELDS))
+        selector = _parse_selector(match)
+    except ValueError as e:
+        return _error(response, 400, str(e))
+    name = selector.name
+    coll = collect_metrics()
+    if coll.error:
+        return _error(response, 500, coll.error)
+
+    series: list[Sample] = []
+    for fam in coll.find_by_name(name):  # type: ignore
+        samples = _filter_samples(fam, selector)
+        if fam.name != name:
+            samples = [s for s in samples if s.name == name]
+        series.extend(samples)
+    page, meta = _page(series, offset, limit, coll)
+    return GenericResponse(
+        success=True, data={"series": [_sample(s, selected) for s in page], **meta}
+    )
+
+
+@router.get("/search")
+async def search(
+    response: Response,
+    q: str,
+    fields: str | None = None,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=PAGE_LIMIT),
+) -> GenericResponse[dict[str, Any]]:
+    """Metric families whose name, help or type contains `q`."""
+    metrics_query_counter.labels("search").inc()
+    try:
+        selected = _parse_fields(fields, SUMMARY_FIELDS)
+    except ValueError as e:
+        return _error(response, 400, str(e))
+    coll = collect_metrics()
+    if coll.error:
+        return _error(response, 500, coll.error)
+
+    page, meta = _page(coll.search(q), offset, limit, coll)
+    return GenericResponse(
+        success=True,
+        data={
+            "metrics": [{field: item[field] for field in selected} for item in page],
+            **meta,
+        },
     )
@@ -2,8 +2,10 @@ from fastapi import APIRouter
 
 from .health.router import router as health_router
 from .metrics.router import router as metrics_router
+from .status.router import router as status_router
 
 router = APIRouter()
 
 router.include_router(health_router, prefix="/health")
 router.include_router(metrics_router, prefix="/metrics")
+router.include_router(status_router, prefix="/status")
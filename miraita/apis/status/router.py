@@ -0,0 +1,59 @@
+from email.utils import formatdate, parsedate_to_datetime
+
+from fastapi import APIRouter, Request, Response
+
+from miraita.plugins.status import (  # entari: plugin
+    StatusImage,
+    config,
+    draw_async,
+    current_etag,
+    render_cache,
+    get_encode_options,
+)
+
+router = APIRouter(tags=["Status"])
+
+
+def _not_modified(request: Request, etag: str, sampled_at: float) -> bool:
+    """按 `If-None-Match` 与 `If-Modified-Since` 判断客户端的缓存是否仍然有效"""
+    if if_none_match := request.headers.get("If-None-Match"):
+        tags = {
+            tag.strip().removeprefix("W/").strip('"')
+            for tag in if_none_match.split(",")
+        }
+        return "*" in tags or etag in tags
+    if if_modified_since := request.headers.get("If-Modified-Since"):
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(sampled_at) <= since
+    return False
+
+
+def _headers(etag: str, sampled_at: float) -> dict[str, str]:
+    return {
+        "ETag": f'"{etag}"',
+        "Last-Modified": formatdate(sampled_at, usegmt=True),
+        "Cache-Control": "no-cache",
+    }
+
+
+@router.get("/")
+async def status_card(request: Request, platform: str = "") -> Response:
+    """
+    Status card image, the same one `/status` sends in chat.
+
+    Returns 304 when the sampled system status has not changed since the
+    version identified by `If-None-Match` / `If-Modified-Since`.
+    """
+    options = get_encode_options(platform)
+    etag, sampled_at = current_etag(options)
+    if _not_modified(request, etag, sampled_at):
+        return Response(status_code=304, headers=_headers(etag, sampled_at))
+
+    image: StatusImage = await render_cache.get(options, draw_async, config.render_ttl)
+    headers = _headers(image.etag, image.sampled_at)
+    if _not_modified(request, image.etag, image.sampled_at):
+        return Response(status_code=304, headers=headers)
+    return Response(image.data, media_type=image.mime, headers=headers)
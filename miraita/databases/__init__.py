@@ -1,2 +1,8 @@
 from .user import User as User
 from .user import Bind as Bind
+from .resolver import BindResolver as BindResolver
+from .resolver import bind_resolver as bind_resolver
+from .registration import RegistrationBuffer as RegistrationBuffer
+from .registration import registration_buffer as registration_buffer
+from .engine import EngineProfile as EngineProfile
+from .tuning import tune_engine as tune_engine
@@ -0,0 +1,149 @@
+"""
+数据库引擎配置
+
+`entari_plugin_database` 为所有绑定使用同一组引擎参数，
+这里按 `EngineProfile` 为单个绑定重新创建引擎：
+
+- 连接池大小、溢出与超时（内存 SQLite 只有一个连接，不使用连接池参数）
+- SQLite 在每个新连接上设置 `journal_mode`、`synchronous`、`cache_size`
+  与 `busy_timeout`
+- SQLAlchemy 的编译缓存与驱动的语句缓存（sqlite3 的 `cached_statements`、
+  asyncpg 的 `prepared_statement_cache_size`）
+
+本模块不依赖插件上下文，基准测试可以直接加载。
+"""
+
+from time import perf_counter
+from typing import Any, Literal
+from collections.abc import Callable, Mapping
+
+from arclet.entari import BasicConfModel
+from sqlalchemy import event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+OPERATIONS = frozenset({"SELECT", "INSERT", "UPDATE", "DELETE", "PRAGMA", "CREATE"})
+"""按语句的第一个关键字统计耗时，其余语句计为 `OTHER`"""
+
+
+class EngineProfile(BasicConfModel):
+    pool_size: int = 5
+    """连接池保持的连接数"""
+    max_overflow: int = 10
+    """连接池满时最多额外创建的连接数"""
+    pool_timeout: float = 30
+    """等待空闲连接的超时时间（单位：秒）"""
+    pool_recycle: int = -1
+    """连接的最大复用时间（单位：秒），为 -1 时不回收"""
+    pool_pre_ping: bool = True
+    """取出连接时先检查连接是否可用"""
+    query_cache_size: int = 500
+    """SQLAlchemy 编译缓存的语句数量"""
+    statement_cache_size: int = 128
+    """驱动的预编译语句缓存数量"""
+    sqlite_journal_mode: Literal["wal", "delete", "truncate", "persist", "memory"] = (
+        "wal"
+    )
+    """SQLite 日志模式，WAL 模式下读写互不阻塞"""
+    sqlite_synchronous: Literal["off", "normal", "full", "extra"] = "normal"
+    """SQLite 同步级别，WAL 模式下 `normal` 不会损坏数据库，只可能丢失最后的事务"""
+    sqlite_cache_size: int = -16000
+    """SQLite 页缓存大小，负数表示 KiB"""
+    sqlite_busy_timeout: int = 5000
+    """SQLite 等待写锁的超时时间（单位：毫秒）"""
+
+
+def is_memory_sqlite(url: URL) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def sqlite_pragmas(profile: EngineProfile) -> list[str]:
+    return [
+        f"PRAGMA journal_mode={profile.sqlite_journal_mode}",
+        f"PRAGMA synchronous={profile.sqlite_synchronous}",
+        f"PRAGMA cache_size={profile.sqlite_cache_size}",
+        f"PRAGMA busy_timeout={profile.sqlite_busy_timeout}",
+    ]
+
+
+def _timed_pool(observe: Callable[[float], None]) -> type[AsyncAdaptedQueuePool]:
+    class TimedQueuePool(AsyncAdaptedQueuePool):
+        """记录取出连接耗时的连接池，包括等待空闲连接与新建连接的时间"""
+
+        def connect(self):
+            start = perf_counter()
+            try:
+                return super().connect()
+            finally:
+                observe(perf_counter() - start)
+
+    return TimedQueuePool
+
+
+def create_engine(
+    url: str | URL,
+    profile: EngineProfile,
+    on_checkout: Callable[[float], None] | None = None,
+    on_query: Callable[[str, float], None] | None = None,
+    base_options: Mapping[str, Any] | None = None,
+) -> AsyncEngine:
+    """
+    按 `profile` 创建引擎
+
+    `on_checkout` 接收取出连接的耗时，`on_query` 接收语句类型与执行耗时，
+    `base_options` 为其余的引擎选项（如数据库插件配置的 `options`），
+    与 `profile` 冲突时以 `profile` 为准
+    """
+    url = make_url(url)
+    options: dict[str, Any] = {
+        **(base_options or {}),
+        "pool_pre_ping": profile.pool_pre_ping,
+        "query_cache_size": profile.query_cache_size,
+    }
+    backend = url.get_backend_name()
+    if backend == "sqlite":
+        options["connect_args"] = {
+            **options.get("connect_args", {}),
+            "cached_statements": profile.statement_cache_size,
+        }
+    elif url.get_driver_name() == "asyncpg":
+        url = url.update_query_dict(
+            {"prepared_statement_cache_size": str(profile.statement_cache_size)}
+        )
+    if not is_memory_sqlite(url):
+        options.update(
+            pool_size=profile.pool_size,
+            max_overflow=profile.max_overflow,
+            pool_timeout=profile.pool_timeout,
+            pool_recycle=profile.pool_recycle,
+        )
+        if on_checkout is not None:
+            options["poolclass"] = _timed_pool(on_checkout)
+    engine = create_async_engine(url, **options)
+
+    if backend == "sqlite":
+        pragmas = sqlite_pragmas(profile)
+        if is_memory_sqlite(url):
+            pragmas = pragmas[1:]  # 内存数据库不支持 WAL
+
+        @event.listens_for(engine.sync_engine, "connect")
+        def set_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for pragma in pragmas:
+                cursor.execute(pragma)
+            cursor.close()
+
+    if on_query is not None:
+
+        @event.listens_for(engine.sync_engine, "before_cursor_execute")
+        def before_execute(conn, cursor, statement, parameters, context, executemany):
+            context._query_start = perf_counter()
+
+        @event.listens_for(engine.sync_engine, "after_cursor_execute")
+        def after_execute(conn, cursor, statement, parameters, context, executemany):
+            elapsed = perf_counter() - context._query_start
+            operation = statement.lstrip().split(None, 1)[0].upper()
+            on_query(operation if operation in OPERATIONS else "OTHER", elapsed)
+
+    return engine
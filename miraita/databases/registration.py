@@ -0,0 +1,217 @@
+import time
+import asyncio
+from collections import OrderedDict
+
+from arclet.entari import keeping
+from prometheus_client import REGISTRY
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+
+from miraita.log import logger
+from miraita.plugins.prometheus import Counter, Gauge, Histogram  # entari: plugin
+
+from .user import User, Bind
+from .resolver import QUERY_CHUNK, BindKey, bind_resolver
+
+registration_queue_gauge = keeping(
+    "registration_queue_gauge",
+    obj_factory=lambda: Gauge(
+        "miraita_registration_queue_depth",
+        "Number of message senders waiting to be registered",
+    ),
+    dispose=lambda gauge: REGISTRY.unregister(gauge),
+)
+
+registration_flush_histogram = keeping(
+    "registration_flush_histogram",
+    obj_factory=lambda: Histogram(
+        "miraita_registration_flush_seconds",
+        "Histogram of time spent writing one batch of sender registrations",
+        buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+    ),
+    dispose=lambda histogram: REGISTRY.unregister(histogram),
+)
+
+registration_counter = keeping(
+    "registration_counter",
+    obj_factory=lambda: Counter(
+        "miraita_registrations",
+        "Total number of sender registrations by result "
+        "(created/existing/dropped/failed)",
+        ["result"],
+    ),
+    dispose=lambda counter: REGISTRY.unregister(counter),
+)
+
+
+class RegistrationBuffer:
+    """
+    消息发送者注册的写缓冲
+
+    收到消息时只把发送者放入内存队列，由后台任务批量写入：
+    队列达到 `batch_size` 时立即写入，否则由定时任务每隔一段时间写入一次。
+    每一批在同一个事务中先查询已有的绑定，再为新账号批量创建 `User` 与 `Bind`。
+
+    - 去重：`dedup_window` 秒内已注册过的账号不会再次入队
+    - 背压：数据库写入跟不上时队列最多保留 `max_pending` 个账号，
+      超出的账号被丢弃，等其下一次发言时再入队
+    - 重试：写入失败的一批放回队首，下一次以减半的批次重试，
+      连续失败 `max_retries` 次的账号被丢弃，等其下一次发言时再入队
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 200,
+        max_pending: int = 5000,
+        dedup_window: float = 3600,
+        max_seen: int = 100000,
+        max_retries: int = 5,
+    ):
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.dedup_window = dedup_window
+        self.max_seen = max_seen
+        self.max_retries = max_retries
+        self._pending: OrderedDict[BindKey, int] = OrderedDict()
+        """待写入的账号及其写入失败的次数"""
+        self._seen: OrderedDict[BindKey, float] = OrderedDict()
+        """已注册账号的过期时间"""
+        self._lock = asyncio.Lock()
+        self._flush_task: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def _recently_seen(self, key: BindKey) -> bool:
+        expires = self._seen.get(key)
+        if expires is None:
+            return False
+        if expires < time.monotonic():
+            del self._seen[key]
+            return False
+        return True
+
+    def _mark_seen(self, keys: list[BindKey]) -> None:
+        expires = time.monotonic() + self.dedup_window
+        for key in keys:
+            self._seen[key] = expires
+            self._seen.move_to_end(key)
+        while len(self._seen) > self.max_seen:
+            self._seen.popitem(last=False)
+
+    def offer(self, platform: str, platform_id: str) -> bool:
+        """将发送者放入队列，返回是否入队"""
+        key = (platform, platform_id)
+        if key in self._pending or self._recently_seen(key):
+            return False
+        if len(self._pending) >= self.max_pending:
+            registration_counter.labels("dropped").inc()
+            return False
+        self._pending[key] = 0
+        if len(self._pending) >= self.batch_size and not self._lock.locked():
+            if self._flush_task is None or self._flush_task.done():
+                self._flush_task = asyncio.create_task(self.flush())
+                self._flush_task.add_done_callback(self._log_flush_error)
+        return True
+
+    @staticmethod
+    def _log_flush_error(task: asyncio.Task) -> None:
+        if not task.cancelled() and (exc := task.exception()) is not None:
+            logger.opt(exception=exc).error("Failed to flush sender registrations")
+
+    def _take_batch(self) -> dict[BindKey, int]:
+        """从队首取出一批，失败过的账号按失败次数减半批次，以便隔离无法写入的账号"""
+        failures = next(iter(self._pending.values()))
+        size = max(self.batch_size >> failures, 1)
+        batch: dict[BindKey, int] = {}
+        while self._pending and len(batch) < size:
+            key, failures = self._pending.popitem(last=False)
+            batch[key] = failures
+        return batch
+
+    async def flush(self) -> None:
+        """写入队列中的所有账号"""
+        async with self._lock:
+            while self._pending:
+                batch = self._take_batch()
+                start = time.perf_counter()
+                try:
+                    created = await self._write(batch)
+                except SQLAlchemyError as e:
+                    self._requeue(batch)
+                    logger.warning(f"Failed to register {len(batch)} senders: {e}")
+                    return
+                except BaseException as e:
+                    # 其他异常不丢失已取出的一批，取消（如退出时的写入）不计入失败次数
+                    self._requeue(batch, failed=isinstance(e, Exception))
+                    raise
+                registration_flush_histogram.observe(time.perf_counter() - start)
+                registration_counter.labels("created").inc(created)
+                registration_counter.labels("existing").inc(len(batch) - created)
+                self._mark_seen(list(batch))
+
+    def _requeue(self, batch: dict[BindKey, int], failed: bool = True) -> None:
+        """
+        将未写入的一批放回队首，等待下一次写入重试
+
+        `failed` 为真时计入各账号的失败次数，超过重试次数的丢弃
+        """
+        dropped = 0
+        for key, failures in reversed(batch.items()):
+            if failed:
+                failures += 1
+                if failures >= self.max_retries:
+                    dropped += 1
+                    continue
+            self._pending[key] = failures
+            self._pending.move_to_end(key, last=False)
+        if dropped:
+            registration_counter.labels("failed").inc(dropped)
+            logger.warning(
+                f"Gave up registering {dropped} senders "
+                f"after {self.max_retries} failed attempts"
+            )
+
+    async def _write(self, batch: dict[BindKey, int]) -> int:
+        """在一个事务中注册一批账号，返回新建的数量"""
+        by_platform: dict[str, list[str]] = {}
+        for platform, platform_id in batch:
+            by_platform.setdefault(platform, []).append(platform_id)
+
+        async with bind_resolver.service().get_session() as session:
+            existing: set[BindKey] = set()
+            for platform, ids in by_platform.items():
+                for offset in range(0, len(ids), QUERY_CHUNK):
+                    rows = await session.scalars(
+                        select(Bind.platform_id).where(
+                            Bind.platform == platform,
+                            Bind.platform_id.in_(ids[offset : offset + QUERY_CHUNK]),
+                        )
+                    )
+                    existing.update((platform, platform_id) for platform_id in rows)
+
+            new = [key for key in batch if key not in existing]
+            if not new:
+                return 0
+            # 昵称可能重复，统一用户名使用唯一的 `平台:账号`
+            users = {key: User(name=f"{key[0]}:{key[1]}") for key in new}
+            session.add_all(users.values())
+            await session.flush()
+            session.add_all(
+                Bind(
+                    platform=platform,
+                    platform_id=platform_id,
+                    bind_id=user.id,
+                    original_id=user.id,
+                )
+                for (platform, platform_id), user in users.items()
+            )
+            await session.commit()
+
+        for platform, platform_id in new:
+            bind_resolver.invalidate(platform, platform_id)
+        return len(new)
+
+
+registration_buffer = keeping("registration_buffer", obj_factory=RegistrationBuffer)
+registration_queue_gauge.set_function(lambda: len(registration_buffer))
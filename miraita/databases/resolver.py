@@ -0,0 +1,147 @@
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
+
+from creart import it
+from launart import Launart
+from sqlalchemy import select
+from graia.amnesia.builtins.sqla import SqlalchemyService
+
+from .user import Bind
+
+QUERY_CHUNK = 500
+"""单条查询中 `IN` 的最大参数数量，低于 SQLite 的变量数上限"""
+
+BindKey = tuple[str, str]
+"""`(平台, 平台账号 ID)`"""
+
+
+class BindResolver:
+    """
+    平台账号到统一用户的解析
+
+    查询结果（包括未绑定）缓存在有界的 LRU 中，`ttl` 秒后过期；
+    通过 `rebind` 修改绑定时会立即失效对应的缓存。
+    查询期间被失效的账号不会写入缓存，避免查询前读到的旧绑定覆盖失效。
+    批量解析时，缓存未命中的账号按平台分组，每个平台只查询一次。
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._cache: OrderedDict[BindKey, tuple[int | None, float]] = OrderedDict()
+        self._generations: dict[BindKey, int] = {}
+        """查询进行期间各账号被失效的次数，没有进行中的查询时清空"""
+        self._epoch = 0
+        """`clear` 的次数"""
+        self._querying = 0
+
+    @staticmethod
+    def service() -> SqlalchemyService:
+        return it(Launart).get_component(SqlalchemyService)
+
+    def _get(self, key: BindKey) -> tuple[bool, int | None]:
+        entry = self._cache.get(key)
+        if entry is None or entry[1] < time.monotonic():
+            return False, None
+        self._cache.move_to_end(key)
+        return True, entry[0]
+
+    def _generation(self, key: BindKey) -> tuple[int, int]:
+        return self._epoch, self._generations.get(key, 0)
+
+    def _put(self, key: BindKey, bind_id: int | None) -> None:
+        self._cache[key] = (bind_id, time.monotonic() + self.ttl)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+
+    async def resolve(self, platform: str, platform_id: str) -> int | None:
+        """返回绑定的统一用户 ID，未绑定时返回 `None`"""
+        return (await self.resolve_many([(platform, platform_id)]))[
+            (platform, platform_id)
+        ]
+
+    async def resolve_many(self, keys: Iterable[BindKey]) -> dict[BindKey, int | None]:
+        result: dict[BindKey, int | None] = {}
+        missing: dict[str, set[str]] = {}
+        for key in keys:
+            if key in result:
+                continue
+            found, bind_id = self._get(key)
+            if found:
+                self.hits += 1
+                result[key] = bind_id
+            else:
+                self.misses += 1
+                missing.setdefault(key[0], set()).add(key[1])
+
+        if not missing:
+            return result
+        generations = {
+            (platform, platform_id): self._generation((platform, platform_id))
+            for platform, ids in missing.items()
+            for platform_id in ids
+        }
+        self._querying += 1
+        try:
+            async with self.service().get_session() as session:
+                for platform, ids in missing.items():
+                    ordered = sorted(ids)
+                    found_ids: dict[str, int] = {}
+                    for start in range(0, len(ordered), QUERY_CHUNK):
+                        chunk = ordered[start : start + QUERY_CHUNK]
+                        rows = await session.execute(
+                            select(Bind.platform_id, Bind.bind_id).where(
+                                Bind.platform == platform, Bind.platform_id.in_(chunk)
+                            )
+                        )
+                        found_ids.update(rows.tuples().all())
+                    for platform_id in ordered:
+                        key = (platform, platform_id)
+                        result[key] = found_ids.get(platform_id)
+                        if self._generation(key) == generations[key]:
+                            self._put(key, result[key])
+        finally:
+            self._querying -= 1
+            if not self._querying:
+                self._generations.clear()
+        return result
+
+    async def rebind(self, platform: str, platform_id: str, bind_id: int) -> None:
+        """将账号绑定到 `bind_id`，首次绑定时同时记为 `original_id`"""
+        async with self.service().get_session() as session:
+            bind = await session.get(Bind, (platform, platform_id))
+            if bind is None:
+                session.add(
+                    Bind(
+                        platform=platform,
+                        platform_id=platform_id,
+                        bind_id=bind_id,
+                        original_id=bind_id,
+                    )
+                )
+            else:
+                bind.bind_id = bind_id
+            await session.commit()
+        self.invalidate(platform, platform_id)
+
+    def invalidate(self, platform: str, platform_id: str) -> None:
+        key = (platform, platform_id)
+        self._cache.pop(key, None)
+        if self._querying:
+            self._generations[key] = self._generations.get(key, 0) + 1
+
+    def clear(self) -> None:
+        self._cache.clear()
+        self._epoch += 1
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0
+
+
+bind_resolver = BindResolver()
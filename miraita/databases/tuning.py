@@ -0,0 +1,149 @@
+import asyncio
+from weakref import WeakSet
+
+from typing import Any
+
+from arclet.entari import ConfigReload, Plugin, keeping, plugin_config
+from arclet.entari.config import config_model_validate
+from arclet.entari.plugin import find_plugin
+from prometheus_client import REGISTRY
+from graia.amnesia.builtins.sqla import SqlalchemyService
+from entari_plugin_database import service
+from entari_plugin_database.config import Config as DatabaseConfig
+
+from miraita.log import logger
+from miraita.plugins.prometheus import Histogram  # entari: plugin
+
+from .engine import EngineProfile, create_engine
+
+plugin = Plugin.current()
+
+BIND_KEY = "miraita"
+"""`databases` 中模型使用的绑定"""
+
+DATABASE_PLUGIN = "entari_plugin_database"
+
+profile = config_model_validate(EngineProfile, plugin_config().get("database", {}))
+"""`miraita` 绑定的引擎配置，对应插件配置中的 `database`"""
+
+
+def _configured_options(config: dict) -> dict[str, Any]:
+    """数据库插件为所有绑定配置的引擎选项"""
+    return dict(config_model_validate(DatabaseConfig, config).options)
+
+
+database_options = _configured_options(
+    database.config if (database := find_plugin(DATABASE_PLUGIN)) else {}
+)
+"""数据库插件配置中的 `options`，重新创建引擎时保留，与 `profile` 冲突时以后者为准"""
+
+db_checkout_histogram = keeping(
+    "db_checkout_histogram",
+    obj_factory=lambda: Histogram(
+        "miraita_db_checkout_seconds",
+        "Histogram of time spent checking out a database connection",
+        ["bind"],
+        buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0),
+    ),
+    dispose=lambda histogram: REGISTRY.unregister(histogram),
+)
+
+db_query_histogram = keeping(
+    "db_query_histogram",
+    obj_factory=lambda: Histogram(
+        "miraita_db_query_seconds",
+        "Histogram of database statement execution time by operation",
+        ["bind", "operation"],
+        buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0),
+    ),
+    dispose=lambda histogram: REGISTRY.unregister(histogram),
+)
+
+
+_tuned_engines: WeakSet = WeakSet()
+"""按当前 `profile` 创建的引擎"""
+
+
+def tune_engine(service: SqlalchemyService, key: str = BIND_KEY) -> bool:
+    """
+    按 `profile` 重新创建服务 `key` 绑定的引擎，返回是否替换了引擎
+
+    未配置该绑定时模型使用默认引擎，不做调整，以免影响其他插件。
+    替换后需要重新初始化服务，会话工厂才会使用新引擎。
+    """
+    if key not in service.engines:
+        logger.warning(
+            f"Database bind {key!r} is not configured, "
+            "skipped tuning the default engine"
+        )
+        return False
+    old = service.engines[key]
+    if old in _tuned_engines:
+        return False
+    service.engines[key] = engine = create_engine(
+        old.url,
+        profile,
+        on_checkout=db_checkout_histogram.labels(key).observe,
+        on_query=lambda operation, elapsed: db_query_histogram.labels(
+            key, operation
+        ).observe(elapsed),
+        base_options=database_options,
+    )
+    _tuned_engines.add(engine)
+    old.sync_engine.dispose(close=False)
+    logger.debug(f"Tuned database engine for bind {key!r}: {profile}")
+    return True
+
+
+_initialize = service.initialize
+"""替换前的 `initialize`，保留子类或其他插件的覆盖"""
+_overridden = "initialize" in vars(service)
+
+
+async def _initialize_tuned():
+    """
+    调整引擎后再初始化服务
+
+    数据库插件在启动与配置重载时都会重新创建引擎并调用 `initialize`，
+    其配置重载的处理器会中止 `ConfigReload` 的传播，无法在其后监听，
+    因此在 `initialize` 中重新调整。
+
+    替换其他插件服务实例上的方法只是临时方案，
+    待 `entari_plugin_database` 提供按绑定设置引擎选项的扩展点后应改用该扩展点。
+    """
+    tune_engine(service)
+    return await _initialize()
+
+
+def _log_initialize_error(task: asyncio.Task) -> None:
+    if not task.cancelled() and (exc := task.exception()) is not None:
+        logger.opt(exception=exc).error("Failed to reinitialize database service")
+
+
+@plugin.dispatch(ConfigReload).register(priority=15)
+async def on_database_reload(event: ConfigReload):
+    """在数据库插件重新创建引擎之前记录新配置中的 `options`"""
+    global database_options
+    if event.scope == "plugin" and event.key in ("database", DATABASE_PLUGIN):
+        database_options = _configured_options(event.value)
+
+
+service.initialize = _initialize_tuned  # type: ignore
+
+
+def _restore_initialize() -> None:
+    if _overridden:
+        service.initialize = _initialize  # type: ignore
+    else:
+        vars(service).pop("initialize", None)
+
+
+plugin.collect(_restore_initialize)
+
+
+_reinitialize: asyncio.Task | None = None
+"""插件重载时重新初始化服务的任务"""
+if hasattr(service, "session_factory") and tune_engine(service):
+    # 服务已经初始化（插件重载），重新初始化使会话工厂使用新引擎
+    _reinitialize = asyncio.get_running_loop().create_task(service.initialize())
+    _reinitialize.add_done_callback(_log_initialize_error)
@@ -14,10 +14,14 @@ class User(Base):
 
 
 class Bind(Base):
+    """平台账号与统一用户的绑定，按 `(platform, platform_id)` 查询"""
+
     __bind_key__ = "miraita"
-    __tablename__ = "user"
+    __tablename__ = "bind"
 
     platform: Mapped[str] = mapped_column(String(32), primary_key=True)
     platform_id: Mapped[str] = mapped_column(String(64), primary_key=True)
-    bind_id: Mapped[int]
-    original_id: Mapped[int]
+    bind_id: Mapped[int] = mapped_column(index=True)
+    """当前绑定的统一用户 ID"""
+    original_id: Mapped[int] = mapped_column(index=True)
+    """首次绑定时的统一用户 ID"""
@@ -1 +1,2 @@
 from . import send_hook as send_hook
+from . import registration as registration
@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from arclet.entari import MessageCreatedEvent, Plugin, Session
+from arclet.entari.scheduler import schedule
+
+from miraita.databases import registration_buffer
+
+FLUSH_INTERVAL = 5
+"""发送者注册的定时写入间隔（单位：秒）"""
+
+plugin = Plugin.current()
+
+
+@plugin.dispatch(MessageCreatedEvent)
+async def register_sender(session: Session):
+    registration_buffer.offer(session.account.platform, session.user.id)
+
+
+@schedule(lambda: timedelta(seconds=FLUSH_INTERVAL))
+async def flush_registrations():
+    await registration_buffer.flush()
+
+
+@plugin.use("::cleanup")
+async def on_cleanup():
+    await registration_buffer.flush()
@@ -7,15 +7,23 @@ from prometheus_client import (
 )
 
 from arclet.entari import metadata, command, Session
-from arclet.alconna import Alconna, Subcommand, CommandMeta
+from arclet.alconna import Alconna, Args, AllParam, Subcommand, CommandMeta
 from arclet.entari.message import MessageChain
 
+from .config import Config
 from . import listener as listener
+from . import promql as promql
+from .exposition import render_exposition as render_exposition
+from .promql import RANGE_FUNCTIONS, QueryError, query
+from .registry import collect_metrics as collect_metrics
+from .system import StatusSnapshot as StatusSnapshot
+from .system import system_sampler as system_sampler
 from .query import (
     get_bot_status,
     get_message_stats,
     get_matcher_stats,
     get_system_metrics,
+    get_loop_stats,
     format_large_number,
 )
 
@@ -25,8 +33,11 @@ metadata(
     author=["Komorebi <mute231010@gmail.com>"],
     description="Prometheus 监控",
     classifier=["服务"],
+    config=Config,
 )
 
+QUERY_RESULT_LIMIT = 20
+"""聊天中最多展示的查询结果条数"""
 
 metrics_alc = Alconna(
     "metrics",
@@ -35,6 +46,8 @@ metrics_alc = Alconna(
     Subcommand("matcher", help_text="查看匹配器统计"),
     Subcommand("system", help_text="查看系统指标"),
     Subcommand("uptime", help_text="查看运行时间"),
+    Subcommand("loop", help_text="查看事件循环状况"),
+    Subcommand("query", Args["expr", AllParam], help_text="执行 PromQL 查询"),
     meta=CommandMeta(
         description="查询 Prometheus 指标数据",
         usage="/metrics",
@@ -56,6 +69,8 @@ async def show_metrics_help(session: Session):
         "  matcher - 查看匹配器统计\n"
         "  system  - 查看系统指标\n"
         "  uptime  - 查看运行时间\n"
+        "  loop    - 查看事件循环状况\n"
+        "  query   - 执行 PromQL 查询\n"
     )
     msg = MessageChain([help_text])
     await session.send(msg)
@@ -105,7 +120,12 @@ async def show_message_stats(session: Session):
     response = "💬 消息统计\n"
     response += "-" * 30 + "\n"
     response += f"总接收消息: {format_large_number(stats.total_received)}\n"
-    response += f"总发送消息: {format_large_number(stats.total_sent)}\n\n"
+    response += f"总发送消息: {format_large_number(stats.total_sent)}\n"
+    if stats.received_per_minute is not None:
+        response += f"近一小时接收: {stats.received_per_minute:.1f} 条/分钟\n"
+    if stats.sent_per_minute is not None:
+        response += f"近一小时发送: {stats.sent_per_minute:.1f} 条/分钟\n"
+    response += "\n"
 
     if stats.received_by_bot:
         response += "接收消息按机器人统计:\n"
@@ -190,3 +210,68 @@ async def show_uptime(session: Session):
 
     msg = MessageChain([response])
     await session.send(msg)
+
+
+@metrics_disp.assign("loop")
+async def show_loop_stats(session: Session):
+    """显示事件循环状况"""
+    stats = get_loop_stats()
+
+    if stats.error:
+        error_msg = f"❌ 获取事件循环状况失败: {stats.error}"
+        msg = MessageChain([error_msg])
+        await session.send(msg)
+        return
+
+    response = "🔁 事件循环状况\n"
+    response += "-" * 30 + "\n"
+    response += f"当前延迟: {stats.last_lag * 1000:.2f}ms\n"
+    response += f"近期最大延迟: {stats.max_lag * 1000:.2f}ms\n"
+    response += f"任务数量: {stats.tasks}\n"
+
+    if stats.slow_by_plugin:
+        response += "\n慢回调按插件统计:\n"
+        for plugin_id, count in stats.slow_by_plugin.items():
+            response += f"  {plugin_id}: {count}\n"
+
+    if stats.recent_slow_callbacks:
+        response += "\n最近的慢回调:\n"
+        for slow in stats.recent_slow_callbacks:
+            response += (
+                f"  [{slow.occurred_at}] {slow.duration * 1000:.0f}ms\n"
+                f"     {slow.location}\n"
+            )
+
+    msg = MessageChain([response.rstrip()])
+    await session.send(msg)
+
+
+@metrics_disp.assign("query")
+async def run_query(session: Session, expr: list):
+    """执行 PromQL 查询"""
+    expression = " ".join(str(part) for part in expr)
+    try:
+        result = await query(expression)
+    except QueryError as e:
+        msg = MessageChain([f"❌ 查询失败: {e}"])
+        await session.send(msg)
+        return
+
+    if not result:
+        hint = ""
+        if any(f"{func}(" in expression for func in RANGE_FUNCTIONS):
+            hint = "\n未持续采样的序列在首次查询时只有一个采样点，请稍后再次查询"
+        msg = MessageChain([f"🔍 {expression}\n没有匹配的时间序列{hint}"])
+        await session.send(msg)
+        return
+
+    response = f"🔍 {expression} ({len(result)} 条)\n"
+    response += "-" * 30 + "\n"
+    for series in result[:QUERY_RESULT_LIMIT]:
+        labels = ", ".join(f'{k}="{v}"' for k, v in series.labels.items())
+        response += f"{{{labels}}} => {series.value:.6g}\n"
+    if len(result) > QUERY_RESULT_LIMIT:
+        response += f"... 省略 {len(result) - QUERY_RESULT_LIMIT} 条\n"
+
+    msg = MessageChain([response.rstrip()])
+    await session.send(msg)
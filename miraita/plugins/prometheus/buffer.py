@@ -0,0 +1,38 @@
+from prometheus_client import Counter
+
+
+class CounterBuffer:
+    """
+    计数器增量缓冲区
+
+    在事件循环内按 `(计数器, 标签值)` 聚合增量，定期或在抓取前一次性写入计数器，
+    使消息热路径上只剩一次字典操作，不再需要 `.labels()` 查找与加锁。
+    缓冲区只应在事件循环线程中使用。
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._pending: dict[tuple[Counter, tuple[str, ...]], float] = {}
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def inc(self, counter: Counter, *labels: str, amount: float = 1) -> None:
+        """累加一次增量，缓冲区未启用时直接写入计数器"""
+        if not self.enabled:
+            counter.labels(*labels).inc(amount)
+            return
+        key = (counter, labels)
+        pending = self._pending
+        pending[key] = pending.get(key, 0) + amount
+
+    def flush(self) -> None:
+        """将缓冲的增量写入计数器"""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        for (counter, labels), amount in pending.items():
+            counter.labels(*labels).inc(amount)
+
+
+counter_buffer = CounterBuffer()
@@ -0,0 +1,226 @@
+import time
+import heapq
+from itertools import count
+from collections.abc import Callable, Hashable
+
+from prometheus_client import Counter
+
+OTHER_LABEL = "other"
+"""超出上限的标签值被折叠到的标签值"""
+
+
+class LazyMinCounter:
+    """
+    支持快速获取最小计数项的计数器
+
+    计数只增不减，堆中的过期条目在取最小值时才被修正，
+    因此每次计数只需 O(1)，取最小值摊还 O(log n)。
+    """
+
+    def __init__(self):
+        self.counts: dict[Hashable, int] = {}
+        self._heap: list[tuple[int, int, Hashable]] = []
+        self._seq = count()
+
+    def __contains__(self, item: Hashable) -> bool:
+        return item in self.counts
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def add(self, item: Hashable, value: int = 0) -> None:
+        self.counts[item] = value
+        heapq.heappush(self._heap, (value, next(self._seq), item))
+
+    def incr(self, item: Hashable, value: int = 1) -> int:
+        self.counts[item] += value
+        return self.counts[item]
+
+    def remove(self, item: Hashable) -> int:
+        """移除计数项，堆中的条目在下次取最小值时丢弃"""
+        return self.counts.pop(item)
+
+    def min(self) -> tuple[Hashable, int]:
+        heap = self._heap
+        while True:
+            value, _, item = heap[0]
+            current = self.counts.get(item)
+            if current == value:
+                return item, value
+            if current is None:
+                heapq.heappop(heap)
+            else:
+                heapq.heapreplace(heap, (current, next(self._seq), item))
+
+    def pop_min(self) -> tuple[Hashable, int]:
+        item, value = self.min()
+        heapq.heappop(self._heap)
+        del self.counts[item]
+        return item, value
+
+
+class SpaceSaving:
+    """
+    Space-Saving 流式 heavy hitter 统计
+
+    在固定的 `capacity` 个计数器内估计出现频率最高的项，
+    任意项的估计值与真实值之差不超过其 `error`。
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.counters = LazyMinCounter()
+        self.errors: dict[Hashable, int] = {}
+
+    def offer(self, item: Hashable) -> int:
+        """记录一次出现，返回其估计计数"""
+        if item in self.counters:
+            return self.counters.incr(item)
+        if len(self.counters) < self.capacity:
+            self.counters.add(item, 1)
+            self.errors[item] = 0
+            return 1
+        evicted, floor = self.counters.pop_min()
+        del self.errors[evicted]
+        self.counters.add(item, floor + 1)
+        self.errors[item] = floor
+        return floor + 1
+
+    def guaranteed(self, item: Hashable) -> int:
+        """`item` 至少出现过的次数"""
+        if item not in self.counters:
+            return 0
+        return self.counters.counts[item] - self.errors[item]
+
+
+class CardinalityLimiter:
+    """
+    标签基数限制器
+
+    精确保留出现频率最高的 `limit` 个标签值，其余值折叠为 `other`；
+    超过 `ttl` 秒未出现的标签值会被淘汰，并通过 `on_evict` 通知调用方清理时间序列。
+    `limit` 为 0 时不做任何限制。
+
+    `evict` 为 `False` 时已保留的标签值永不淘汰，达到上限后新的值一律折叠为 `other`，
+    适用于无法移除时间序列的场景。
+    """
+
+    def __init__(
+        self,
+        limit: int,
+        ttl: float,
+        on_evict: Callable[[str], None] | None = None,
+        sketch_factor: int = 10,
+        evict: bool = True,
+    ):
+        self.limit = limit
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self.evict = evict
+        self.sketch_factor = sketch_factor
+        self._admitted = LazyMinCounter()
+        self._last_seen: dict[str, float] = {}
+        self._sketch = SpaceSaving(max(limit * sketch_factor, 1))
+        self._last_sweep = time.monotonic()
+
+    def configure(self, limit: int, ttl: float) -> None:
+        """调整上限与淘汰时间，超出新上限的标签值立即淘汰"""
+        self.limit = limit
+        self.ttl = ttl
+        self._sketch.capacity = max(limit * self.sketch_factor, 1)
+        while self.evict and len(self._admitted) > max(limit, 0):
+            self._evict(self._admitted.min()[0])  # type: ignore
+
+    @property
+    def admitted(self) -> int:
+        """当前保留的标签值数量"""
+        return len(self._admitted)
+
+    def resolve(self, value: str) -> str:
+        """返回 `value` 实际应使用的标签值"""
+        if self.limit <= 0:
+            return value
+
+        now = time.monotonic()
+        if self.evict and now - self._last_sweep >= min(self.ttl, 60):
+            self.expire(now)
+
+        self._sketch.offer(value)
+        if value in self._admitted:
+            self._admitted.incr(value)
+            self._last_seen[value] = now
+            return value
+
+        if len(self._admitted) < self.limit:
+            self._admit(value, now)
+            return value
+        if not self.evict:
+            return OTHER_LABEL
+
+        weakest, weakest_count = self._admitted.min()
+        if self._sketch.guaranteed(value) > weakest_count:
+            self._evict(weakest)
+            self._admit(value, now)
+            return value
+
+        return OTHER_LABEL
+
+    def expire(self, now: float | None = None) -> None:
+        """淘汰超过 `ttl` 未出现的标签值"""
+        now = time.monotonic() if now is None else now
+        self._last_sweep = now
+        deadline = now - self.ttl
+        for value in [v for v, seen in self._last_seen.items() if seen < deadline]:
+            self._evict(value)
+
+    def _admit(self, value: str, now: float) -> None:
+        self._admitted.add(value, self._sketch.guaranteed(value))
+        self._last_seen[value] = now
+
+    def _evict(self, value: str) -> None:
+        self._admitted.remove(value)
+        del self._last_seen[value]
+        if self.on_evict:
+            self.on_evict(value)
+
+
+class UserLabelLimiter:
+    """
+    限制 `["bot_id", "platform", "user_id"]` 计数器的 `user_id` 基数
+
+    被淘汰用户的时间序列会被移除，其计数累加到同一机器人的 `other` 序列上，
+    保证按机器人汇总的总数不变。
+
+    多进程模式下 `Counter.remove()` 不会删除数据文件中的序列，折叠会使计数重复，
+    此时以 `fold=False` 创建：已保留的用户不再淘汰，超出上限的新用户直接计入 `other`。
+    """
+
+    def __init__(
+        self, counter: Counter, limit: int = 0, ttl: float = 86400, fold: bool = True
+    ):
+        self.counter = counter
+        self.limiter = CardinalityLimiter(limit, ttl, on_evict=self._fold, evict=fold)
+        self.before_fold: Callable[[], None] | None = None
+        """折叠序列前的回调，用于先写入尚未提交的增量"""
+        self._series: dict[str, set[tuple[str, str]]] = {}
+
+    def configure(self, limit: int, ttl: float) -> None:
+        self.limiter.configure(limit, ttl)
+
+    def labels(self, bot_id: str, platform: str, user_id: str) -> tuple[str, str, str]:
+        """返回实际应使用的标签值"""
+        if self.limiter.limit <= 0:
+            return bot_id, platform, user_id
+
+        user_id = self.limiter.resolve(user_id)
+        if user_id != OTHER_LABEL:
+            self._series.setdefault(user_id, set()).add((bot_id, platform))
+        return bot_id, platform, user_id
+
+    def _fold(self, user_id: str) -> None:
+        if self.before_fold:
+            self.before_fold()
+        for bot_id, platform in self._series.pop(user_id, ()):
+            value = self.counter.labels(bot_id, platform, user_id)._value.get()
+            self.counter.remove(bot_id, platform, user_id)
+            self.counter.labels(bot_id, platform, OTHER_LABEL).inc(value)
@@ -0,0 +1,116 @@
+from typing import Literal
+
+from arclet.entari import BasicConfModel, plugin_config
+from arclet.entari.config import model_field
+
+RECEIVED_MESSAGES_EXPR = "sum(miraita_received_messages_total)"
+SENT_MESSAGES_EXPR = "sum(miriata_sent_messages_total)"
+
+
+class Config(BasicConfModel):
+    exposition_mode: Literal["direct", "interval", "lazy"] = "direct"
+    """
+    `/api/v1/metrics` 的输出模式
+
+    - `direct`: 每次抓取时实时生成
+    - `interval`: 由后台任务按 `exposition_interval` 定时生成快照
+    - `lazy`: 快照超过 `exposition_ttl` 后，在下一次抓取时重新生成
+    """
+    exposition_interval: float = 15
+    """`interval` 模式下快照的生成间隔（单位：秒）"""
+    exposition_ttl: float = 5
+    """`lazy` 模式下快照的有效期（单位：秒）"""
+    user_label_limit: int = 0
+    """
+    消息计数器中 `user_id` 标签最多保留的用户数量，为 0 时不做限制
+
+    超出上限后只保留消息量最多的用户，其余用户计入 `user_id="other"`。
+    多进程模式下无法移除已有的序列，已保留的用户不会被替换或闲置淘汰，
+    达到上限后新出现的用户一律计入 `other`
+    """
+    user_label_ttl: float = 86400
+    """`user_id` 标签的闲置淘汰时间（单位：秒）"""
+    counter_flush_interval: float = 0
+    """
+    消息计数器增量的批量写入间隔（单位：秒），为 0 时每条消息直接写入计数器
+
+    缓冲的增量在每次抓取或查询前也会被写入
+    """
+    matcher_sample_rate: int = 1
+    """
+    订阅者耗时的抽样率，每 N 次调用记录一次耗时
+
+    调用次数与调用结果不受抽样影响，平均耗时按被计时的调用计算
+    """
+    loop_heartbeat_interval: float = 1
+    """事件循环心跳间隔（单位：秒），用于测量循环延迟，为 0 时不启用"""
+    loop_max_lag_window: float = 300
+    """`/metrics loop` 中最大延迟的统计窗口（单位：秒）"""
+    loop_slow_callback_threshold: float = 0.1
+    """
+    慢回调阈值（单位：秒），为 0 时不启用
+
+    单个回调占用事件循环超过该时间时，记录其所属插件与代码位置
+    """
+    system_sample_interval: float = 5
+    """系统状态（CPU、内存、磁盘、网络）的采样间隔（单位：秒）"""
+    system_disk_mounts: list[str] = model_field(default_factory=lambda: ["/"])
+    """统计磁盘用量的挂载点，第一个挂载点显示在 `/status` 中"""
+    multiprocess_dir: str = ""
+    """
+    多进程模式的数据目录，为空时不启用
+
+    多个工作进程共用同一个目录时，
+    `/api/v1/metrics` 与 `/metrics` 命令会汇总所有进程的指标
+    """
+    gauge_multiprocess_mode: Literal[
+        "all",
+        "liveall",
+        "min",
+        "livemin",
+        "max",
+        "livemax",
+        "sum",
+        "livesum",
+        "mostrecent",
+        "livemostrecent",
+    ] = "livesum"
+    """多进程模式下 gauge 的默认合并方式，`live` 前缀表示只统计存活的进程"""
+    gauge_multiprocess_modes: dict[str, str] = model_field(
+        default_factory=lambda: {
+            "miraita_start_at": "livemin",
+            "miraita_host_info": "livemax",
+        }
+    )
+    """按指标名单独指定 gauge 的合并方式"""
+    multiprocess_cleanup_interval: float = 60
+    """清理已退出进程数据文件的间隔（单位：秒）"""
+    registry_snapshot_ttl: float = 1
+    """指标查询所用快照的有效期（单位：秒），为 0 时每次查询都重新采集"""
+    timeseries_expressions: list[str] = model_field(
+        default_factory=lambda: [RECEIVED_MESSAGES_EXPR, SENT_MESSAGES_EXPR]
+    )
+    """
+    在进程内保留历史的查询表达式，为空时不采样
+
+    `rate()` / `increase()` 会优先使用这些历史，`/metrics message` 据此计算消息速率
+    """
+    timeseries_resolution: float = 15
+    """采样间隔（单位：秒）"""
+    timeseries_retention: float = 3600
+    """原始采样点的保留时间（单位：秒）"""
+    timeseries_rollup_resolution: float = 300
+    """降采样的时间粒度（单位：秒）"""
+    timeseries_rollup_retention: float = 604800
+    """降采样点的保留时间（单位：秒）"""
+    timeseries_max_series: int = 100
+    """最多保留的序列数量"""
+    query_history_max_series: int = 1000
+    """
+    `rate()` / `increase()` 查询未采样的序列时，最多保留历史的序列数量
+
+    超出时淘汰最久未被查询的序列
+    """
+
+
+config = plugin_config(Config)
@@ -0,0 +1,134 @@
+import gzip
+import time
+import asyncio
+from datetime import timedelta
+from dataclasses import dataclass
+
+from arclet.entari.scheduler import schedule
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client.exposition import choose_encoder, gzip_accepted
+
+from miraita.log import logger
+
+from .config import config
+from .buffer import counter_buffer
+from .multiprocess import get_registry
+from .metrics import metrics_snapshot_age_gauge
+
+
+@dataclass
+class Exposition:
+    """预渲染的指标输出"""
+
+    accept: str
+    """生成该输出时协商所用的 `Accept` 请求头"""
+    content_type: str
+    identity: bytes
+    """未压缩的输出"""
+    gzipped: bytes
+    """gzip 压缩后的输出"""
+    rendered_at: float
+
+    @property
+    def age(self) -> float:
+        return max(time.time() - self.rendered_at, 0)
+
+
+class ExpositionCache:
+    """
+    指标输出快照缓存
+
+    按 `Accept` 协商出的格式分别缓存 text / OpenMetrics 输出，
+    每份输出同时保存原始字节与 gzip 压缩后的字节，抓取时直接返回。
+    """
+
+    def __init__(self):
+        self._renders: dict[str, Exposition] = {}
+        self._lock = asyncio.Lock()
+
+    @property
+    def age(self) -> float:
+        """最旧一份快照的年龄（单位：秒），尚无快照时为 0"""
+        if not self._renders:
+            return 0
+        return max(render.age for render in self._renders.values())
+
+    async def get(self, accept: str | None, ttl: float | None = None) -> Exposition:
+        """获取 `accept` 对应格式的快照，快照缺失或超过 `ttl` 时重新生成"""
+        _, content_type = choose_encoder(accept or "")
+        render = self._renders.get(content_type)
+        if render is not None and (ttl is None or render.age < ttl):
+            return render
+
+        async with self._lock:
+            render = self._renders.get(content_type)
+            if render is not None and (ttl is None or render.age < ttl):
+                return render
+            counter_buffer.flush()
+            return await self._render(accept or "")
+
+    async def refresh(self) -> None:
+        """重新生成所有已被请求过的格式，首次调用时生成 text 格式"""
+        accepts = [render.accept for render in self._renders.values()] or [""]
+        counter_buffer.flush()
+        async with self._lock:
+            for accept in accepts:
+                await self._render(accept)
+
+    async def _render(self, accept: str) -> Exposition:
+        encoder, content_type = choose_encoder(accept)
+
+        def _encode() -> Exposition:
+            output = encoder(get_registry())
+            return Exposition(
+                accept=accept,
+                content_type=content_type,
+                identity=output,
+                gzipped=gzip.compress(output, compresslevel=6),
+                rendered_at=time.time(),
+            )
+
+        render = await asyncio.to_thread(_encode)
+        self._renders[content_type] = render
+        return render
+
+
+exposition_cache = ExpositionCache()
+
+metrics_snapshot_age_gauge.set_function(lambda: exposition_cache.age)
+
+
+async def render_exposition(
+    accept: str | None, accept_encoding: str | None
+) -> tuple[bytes, dict[str, str]]:
+    """
+    按照配置的输出模式生成指标输出
+
+    返回输出内容与需要附带的响应头
+    """
+    counter_buffer.flush()
+    if config.exposition_mode == "direct":
+        return generate_latest(get_registry()), {"Content-Type": CONTENT_TYPE_LATEST}
+
+    ttl = config.exposition_ttl if config.exposition_mode == "lazy" else None
+    render = await exposition_cache.get(accept, ttl)
+
+    headers = {
+        "Content-Type": render.content_type,
+        "Age": str(int(render.age)),
+        "Vary": "Accept, Accept-Encoding",
+    }
+    if gzip_accepted(accept_encoding or ""):
+        headers["Content-Encoding"] = "gzip"
+        return render.gzipped, headers
+    return render.identity, headers
+
+
+if config.exposition_mode == "interval":
+
+    @schedule(lambda: timedelta(seconds=config.exposition_interval))
+    async def refresh_exposition():
+        try:
+            await exposition_cache.refresh()
+        except Exception:
+            logger.exception("Failed to refresh metrics exposition")
@@ -1,40 +1,152 @@
+import asyncio
+from datetime import timedelta
+
+from arclet.entari.scheduler import schedule
 from arclet.entari.plugin import get_plugin_subscribers
-from arclet.entari import Session, Plugin, MessageCreatedEvent, MessageChain
+from arclet.entari import Session, Plugin, MessageCreatedEvent, MessageChain, keeping
 
 from satori.client import Account
 from satori.model import LoginStatus, MessageReceipt
 
+from miraita.log import logger
+from miraita.utils import warm_host_facts
+
 from .metrics import (
     miraita_start_at_gauge,
+    host_info_gauge,
     bot_nums_gauge,
     bot_shutdown_counter,
     received_messages_counter,
     sent_messages_counter,
 )
+from .config import config
+from .promql import history, sample
+from .stats import stats_index
+from .buffer import counter_buffer
 from .subscriber import RecordRunningTime
+from .cardinality import UserLabelLimiter
+from .loop import loop_monitor
+from .multiprocess import (
+    multiprocess_enabled,
+    cleanup_dead_processes,
+    mark_current_process_dead,
+)
+from .timeseries import timeseries_store
+from .system import system_sampler
 
 plugin = Plugin.current()
 
+received_user_labels = keeping(
+    "received_user_labels",
+    obj_factory=lambda: UserLabelLimiter(
+        received_messages_counter, fold=not multiprocess_enabled()
+    ),
+)
+received_user_labels.configure(config.user_label_limit, config.user_label_ttl)
+
+sent_user_labels = keeping(
+    "sent_user_labels",
+    obj_factory=lambda: UserLabelLimiter(
+        sent_messages_counter, fold=not multiprocess_enabled()
+    ),
+)
+sent_user_labels.configure(config.user_label_limit, config.user_label_ttl)
+
+counter_buffer.enabled = config.counter_flush_interval > 0
+received_user_labels.before_fold = sent_user_labels.before_fold = counter_buffer.flush
+plugin.collect(counter_buffer.flush)
+plugin.collect(loop_monitor.stop)
+
+system_sampler.mounts = config.system_disk_mounts
+# 首次采样同时作为 `cpu_percent` 的基准点
+system_sampler.sample()
+
+timeseries_store.configure(
+    config.timeseries_expressions,
+    config.timeseries_resolution,
+    config.timeseries_retention,
+    config.timeseries_rollup_resolution,
+    config.timeseries_rollup_retention,
+    config.timeseries_max_series,
+)
+history.max_series = config.query_history_max_series
+
+
+loop_monitor.interval = config.loop_heartbeat_interval
+loop_monitor.threshold = config.loop_slow_callback_threshold
+loop_monitor.window = config.loop_max_lag_window
+try:
+    asyncio.get_running_loop()
+except RuntimeError:
+    pass
+else:
+    # 热重载时应用已在运行，不会再触发 `::startup`
+    loop_monitor.start()
+
 
 @plugin.use("::startup")
 async def on_startup():
     miraita_start_at_gauge.set_to_current_time()
+    loop_monitor.start()
+    host = await warm_host_facts()
+    host_info_gauge.labels(**host.labels()).set(1)
+
+
+@plugin.use("::cleanup")
+async def on_cleanup():
+    counter_buffer.flush()
+    loop_monitor.stop()
+    mark_current_process_dead()
+
+
+if config.counter_flush_interval > 0:
+
+    @schedule(lambda: timedelta(seconds=config.counter_flush_interval))
+    async def flush_counters():
+        counter_buffer.flush()
+
+
+if multiprocess_enabled() and config.multiprocess_cleanup_interval > 0:
+
+    @schedule(lambda: timedelta(seconds=config.multiprocess_cleanup_interval))
+    async def cleanup_multiprocess_files():
+        if dead := cleanup_dead_processes():
+            logger.debug(f"Removed live gauge files of dead processes: {dead}")
+
+
+@schedule(lambda: timedelta(seconds=config.system_sample_interval))
+async def sample_system():
+    system_sampler.sample()
+
+
+if timeseries_store.expressions:
+
+    @schedule(lambda: timedelta(seconds=config.timeseries_resolution))
+    async def sample_timeseries():
+        sample(timeseries_store)
 
 
 @plugin.use("::account_update")
 async def on_account_update(account: Account, status: LoginStatus):
     if status == LoginStatus.CONNECT or status == LoginStatus.ONLINE:
         bot_nums_gauge.labels(account.self_id, account.platform).inc()
+        stats_index.record_bot(account.self_id, account.platform, 1)
     elif status == LoginStatus.DISCONNECT or status == LoginStatus.OFFLINE:
         bot_nums_gauge.labels(account.self_id, account.platform).dec()
         bot_shutdown_counter.labels(account.self_id, account.platform).inc()
+        stats_index.record_bot(account.self_id, account.platform, -1)
+        stats_index.record_shutdown(account.self_id, account.platform)
 
 
 @plugin.dispatch(MessageCreatedEvent)
 async def on_message_created(session: Session):
-    received_messages_counter.labels(
-        session.account.self_id, session.account.platform, session.user.id
-    ).inc()
+    counter_buffer.inc(
+        received_messages_counter,
+        *received_user_labels.labels(
+            session.account.self_id, session.account.platform, session.user.id
+        ),
+    )
+    stats_index.record_received(session.account.self_id, session.account.platform)
 
 
 @plugin.use("::after_send")
@@ -48,9 +160,11 @@ async def on_after_send(
     if session is None:
         return
 
-    sent_messages_counter.labels(
-        account.self_id, account.platform, session.user.id
-    ).inc()
+    counter_buffer.inc(
+        sent_messages_counter,
+        *sent_user_labels.labels(account.self_id, account.platform, session.user.id),
+    )
+    stats_index.record_sent(account.self_id, account.platform)
 
 
 @plugin.use("::plugin/loaded_success")
@@ -60,5 +174,9 @@ async def on_pluin_load(plugin_id: str):
     subscribers = get_plugin_subscribers(plugin_id)
     for sub in subscribers:
         plugin.collect(
-            sub.propagate(RecordRunningTime(f"{sub.callable_target.__module__}"))
+            sub.propagate(
+                RecordRunningTime(
+                    f"{sub.callable_target.__module__}", config.matcher_sample_rate
+                )
+            )
         )
@@ -0,0 +1,188 @@
+import time
+import asyncio
+from types import FrameType
+from collections import deque
+from dataclasses import dataclass
+
+from arclet.entari.plugin import get_plugins
+
+from miraita.log import logger
+
+from .metrics import (
+    event_loop_lag_histogram,
+    event_loop_tasks_gauge,
+    slow_callback_histogram,
+)
+
+UNKNOWN_PLUGIN = "unknown"
+
+
+@dataclass
+class SlowCallback:
+    """一次阻塞事件循环超过阈值的回调"""
+
+    timestamp: float
+    duration: float
+    """回调执行耗时（单位：秒）"""
+    plugin_id: str
+    location: str
+    """`模块:函数:行号`，无法定位时为回调的名称"""
+
+
+def _iter_frames(coro) -> list[FrameType]:
+    """沿 `cr_await` 链由外向内收集协程栈帧"""
+    frames: list[FrameType] = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        frames.append(frame)
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return frames
+
+
+def _plugin_of(module: str, plugin_ids: list[str]) -> str | None:
+    """按最长前缀匹配模块所属的插件"""
+    for plugin_id in plugin_ids:
+        if module == plugin_id or module.startswith(plugin_id + "."):
+            return plugin_id
+    return None
+
+
+def _location(frame: FrameType) -> str:
+    module = frame.f_globals.get("__name__", "")
+    return f"{module}:{frame.f_code.co_name}:{frame.f_lineno}"
+
+
+def attribute(callback) -> tuple[str, str]:
+    """
+    定位回调所属的插件与代码位置
+
+    任务的回调会沿协程的 `cr_await` 链查找，取最内层属于某个插件的栈帧；
+    其他回调按其所在模块归属。
+    """
+    plugin_ids = sorted((p.id for p in get_plugins()), key=len, reverse=True)
+    task = getattr(callback, "__self__", None)
+    if isinstance(task, asyncio.Task):
+        coro = task.get_coro()
+        frames = _iter_frames(coro)
+        for frame in reversed(frames):
+            plugin_id = _plugin_of(frame.f_globals.get("__name__", ""), plugin_ids)
+            if plugin_id:
+                return plugin_id, _location(frame)
+        for frame in reversed(frames):
+            if not frame.f_globals.get("__name__", "").startswith("asyncio"):
+                return UNKNOWN_PLUGIN, _location(frame)
+        return UNKNOWN_PLUGIN, getattr(coro, "__qualname__", None) or task.get_name()
+
+    func = getattr(callback, "__func__", callback)
+    module = getattr(func, "__module__", None) or ""
+    name = getattr(func, "__qualname__", None) or repr(callback)
+    return _plugin_of(module, plugin_ids) or UNKNOWN_PLUGIN, f"{module}:{name}"
+
+
+class LoopMonitor:
+    """
+    事件循环健康状况监控
+
+    - 心跳：每隔 `interval` 秒休眠一次，实际醒来时间与预期之差即为循环延迟，
+      `max_lag` 为最近 `window` 秒内的最大延迟
+    - 任务数：每次心跳时统计存活的任务数量
+    - 慢回调：包装 `asyncio.Handle._run`，记录执行超过 `threshold` 秒的回调及其所属插件
+    """
+
+    def __init__(
+        self,
+        interval: float = 1,
+        threshold: float = 0.1,
+        history: int = 10,
+        window: float = 300,
+    ):
+        self.interval = interval
+        self.threshold = threshold
+        self.window = window
+        self.last_lag: float = 0
+        self._lags: deque[tuple[float, float]] = deque()
+        """窗口内的 `(心跳时间, 延迟)`，延迟单调递减，队首即为窗口内的最大值"""
+        self.tasks: int = 0
+        self.recent: deque[SlowCallback] = deque(maxlen=history)
+        """最近的慢回调"""
+        self.slow_counts: dict[str, int] = {}
+        """各插件的慢回调次数"""
+        self._heartbeat: asyncio.Task | None = None
+        self._original_run = None
+
+    @property
+    def max_lag(self) -> float:
+        """最近 `window` 秒内的最大延迟"""
+        deadline = time.monotonic() - self.window
+        while self._lags and self._lags[0][0] < deadline:
+            self._lags.popleft()
+        return self._lags[0][1] if self._lags else 0
+
+    def _record_lag(self, lag: float) -> None:
+        while self._lags and self._lags[-1][1] <= lag:
+            self._lags.pop()
+        self._lags.append((time.monotonic(), lag))
+
+    def start(self) -> None:
+        if self.interval > 0 and self._heartbeat is None:
+            self._heartbeat = asyncio.create_task(self._beat(), name="loop_heartbeat")
+        if self.threshold > 0:
+            self.install()
+
+    def stop(self) -> None:
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+        self.uninstall()
+
+    async def _beat(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(time.perf_counter() - start - self.interval, 0)
+            self.last_lag = lag
+            self._record_lag(lag)
+            self.tasks = len(asyncio.all_tasks())
+            event_loop_lag_histogram.observe(lag)
+            event_loop_tasks_gauge.set(self.tasks)
+
+    def install(self) -> None:
+        """包装 `Handle._run` 以检测慢回调"""
+        if self._original_run is not None:
+            return
+        original = self._original_run = asyncio.events.Handle._run
+        monitor = self
+
+        def _run(handle: asyncio.Handle):
+            start = time.perf_counter()
+            try:
+                return original(handle)
+            finally:
+                duration = time.perf_counter() - start
+                if duration >= monitor.threshold:
+                    monitor.record(handle, duration)
+
+        asyncio.events.Handle._run = _run  # type: ignore
+
+    def uninstall(self) -> None:
+        if self._original_run is not None:
+            asyncio.events.Handle._run = self._original_run  # type: ignore
+            self._original_run = None
+
+    def record(self, handle: asyncio.Handle, duration: float) -> None:
+        try:
+            plugin_id, location = attribute(handle._callback)  # type: ignore
+        except Exception:
+            plugin_id, location = UNKNOWN_PLUGIN, repr(handle)
+        slow_callback_histogram.labels(plugin_id).observe(duration)
+        self.slow_counts[plugin_id] = self.slow_counts.get(plugin_id, 0) + 1
+        self.recent.append(SlowCallback(time.time(), duration, plugin_id, location))
+        logger.debug(
+            f"Event loop blocked for {duration * 1000:.1f}ms "
+            f"by {location} ({plugin_id})"
+        )
+
+
+loop_monitor = LoopMonitor()
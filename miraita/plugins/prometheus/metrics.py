@@ -1,17 +1,32 @@
+from dataclasses import fields
+
 from prometheus_client import Counter, Gauge, REGISTRY, Histogram
 from arclet.entari import keeping
 
+from miraita.utils import HostFacts
+
+from .multiprocess import gauge_mode, setup_multiprocess
+
+setup_multiprocess()
+
 
 miraita_start_at_gauge = keeping(
     "miraita_start_at_gauge",
-    obj_factory=lambda: Gauge("miraita_start_at", "Start time of the bot"),
+    obj_factory=lambda: Gauge(
+        "miraita_start_at",
+        "Start time of the bot",
+        multiprocess_mode=gauge_mode("miraita_start_at"),
+    ),
     dispose=lambda gauge: REGISTRY.unregister(gauge),
 )
 
 bot_nums_gauge = keeping(
     "bot_nums_gauge",
     obj_factory=lambda: Gauge(
-        "bot_nums", "Total number of bots", ["bot_id", "platform"]
+        "bot_nums",
+        "Total number of bots",
+        ["bot_id", "platform"],
+        multiprocess_mode=gauge_mode("bot_nums"),
     ),
     dispose=lambda gauge: REGISTRY.unregister(gauge),
 )
@@ -54,6 +69,16 @@ matcher_calling_counter = keeping(
     dispose=lambda counter: REGISTRY.unregister(counter),
 )
 
+matcher_outcome_counter = keeping(
+    "matcher_outcome_counter",
+    obj_factory=lambda: Counter(
+        "miraita_matcher_outcomes",
+        "Total number of matcher invocations by outcome",
+        ["plugin_name", "outcome"],
+    ),
+    dispose=lambda counter: REGISTRY.unregister(counter),
+)
+
 matcher_duration_histogram = keeping(
     "matcher_duration_histogram",
     obj_factory=lambda: Histogram(
@@ -81,3 +106,105 @@ matcher_duration_histogram = keeping(
     ),
     dispose=lambda histogram: REGISTRY.unregister(histogram),
 )
+
+metrics_snapshot_age_gauge = keeping(
+    "metrics_snapshot_age_gauge",
+    obj_factory=lambda: Gauge(
+        "miraita_metrics_snapshot_age_seconds",
+        "Age of the cached metrics exposition snapshot in seconds",
+        multiprocess_mode=gauge_mode("miraita_metrics_snapshot_age_seconds"),
+    ),
+    dispose=lambda gauge: REGISTRY.unregister(gauge),
+)
+
+timeseries_series_gauge = keeping(
+    "timeseries_series_gauge",
+    obj_factory=lambda: Gauge(
+        "miraita_timeseries_series",
+        "Number of series retained in the in-process time-series store",
+        multiprocess_mode=gauge_mode("miraita_timeseries_series"),
+    ),
+    dispose=lambda gauge: REGISTRY.unregister(gauge),
+)
+
+timeseries_memory_gauge = keeping(
+    "timeseries_memory_gauge",
+    obj_factory=lambda: Gauge(
+        "miraita_timeseries_memory_bytes",
+        "Memory allocated by the in-process time-series store in bytes",
+        multiprocess_mode=gauge_mode("miraita_timeseries_memory_bytes"),
+    ),
+    dispose=lambda gauge: REGISTRY.unregister(gauge),
+)
+
+timeseries_dropped_gauge = keeping(
+    "timeseries_dropped_gauge",
+    obj_factory=lambda: Gauge(
+        "miraita_timeseries_dropped",
+        "Number of time-series writes dropped because max_series was reached",
+        multiprocess_mode=gauge_mode("miraita_timeseries_dropped"),
+    ),
+    dispose=lambda gauge: REGISTRY.unregister(gauge),
+)
+
+query_history_series_gauge = keeping(
+    "query_history_series_gauge",
+    obj_factory=lambda: Gauge(
+        "miraita_query_history_series",
+        "Number of series retained for PromQL range functions",
+        multiprocess_mode=gauge_mode("miraita_query_history_series"),
+    ),
+    dispose=lambda gauge: REGISTRY.unregister(gauge),
+)
+
+query_history_points_gauge = keeping(
+    "query_history_points_gauge",
+    obj_factory=lambda: Gauge(
+        "miraita_query_history_points",
+        "Number of points retained for PromQL range functions",
+        multiprocess_mode=gauge_mode("miraita_query_history_points"),
+    ),
+    dispose=lambda gauge: REGISTRY.unregister(gauge),
+)
+
+event_loop_lag_histogram = keeping(
+    "event_loop_lag_histogram",
+    obj_factory=lambda: Histogram(
+        "miraita_event_loop_lag_seconds",
+        "Histogram of event loop heartbeat lag in seconds",
+        buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+    ),
+    dispose=lambda histogram: REGISTRY.unregister(histogram),
+)
+
+event_loop_tasks_gauge = keeping(
+    "event_loop_tasks_gauge",
+    obj_factory=lambda: Gauge(
+        "miraita_event_loop_tasks",
+        "Number of live asyncio tasks",
+        multiprocess_mode=gauge_mode("miraita_event_loop_tasks"),
+    ),
+    dispose=lambda gauge: REGISTRY.unregister(gauge),
+)
+
+slow_callback_histogram = keeping(
+    "slow_callback_histogram",
+    obj_factory=lambda: Histogram(
+        "miraita_event_loop_slow_callback_seconds",
+        "Histogram of event loop callbacks exceeding the slow callback threshold",
+        ["plugin_id"],
+        buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+    ),
+    dispose=lambda histogram: REGISTRY.unregister(histogram),
+)
+
+host_info_gauge = keeping(
+    "host_info_gauge",
+    obj_factory=lambda: Gauge(
+        "miraita_host_info",
+        "Host information, always 1",
+        [field.name for field in fields(HostFacts)],
+        multiprocess_mode=gauge_mode("miraita_host_info"),
+    ),
+    dispose=lambda gauge: REGISTRY.unregister(gauge),
+)
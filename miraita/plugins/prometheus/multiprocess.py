@@ -0,0 +1,78 @@
+import os
+from pathlib import Path
+
+import psutil
+from prometheus_client import REGISTRY, CollectorRegistry, values
+from prometheus_client.multiprocess import MultiProcessCollector, mark_process_dead
+
+from miraita.log import logger
+
+from .config import config
+
+_merged_registry: CollectorRegistry | None = None
+
+
+def multiprocess_enabled() -> bool:
+    return bool(config.multiprocess_dir)
+
+
+def setup_multiprocess() -> None:
+    """
+    按配置切换到多进程模式
+
+    多进程模式下每个进程的指标值写入 `multiprocess_dir` 中按 PID 区分的内存映射文件，
+    必须在创建任何指标之前调用。
+    """
+    if not multiprocess_enabled() or getattr(values.ValueClass, "_multiprocess", False):
+        return
+    path = Path(config.multiprocess_dir).resolve()
+    path.mkdir(parents=True, exist_ok=True)
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = str(path)
+    values.ValueClass = values.MultiProcessValue()
+    logger.info(f"Prometheus multiprocess mode enabled: {path}")
+
+
+def gauge_mode(name: str) -> str:
+    """指标名为 `name` 的 gauge 在多进程间的合并方式"""
+    return config.gauge_multiprocess_modes.get(name, config.gauge_multiprocess_mode)
+
+
+def get_registry() -> CollectorRegistry:
+    """
+    抓取与查询所用的注册表
+
+    多进程模式下为汇总所有进程数据文件的注册表，否则为默认的 `REGISTRY`
+    """
+    global _merged_registry
+
+    if not multiprocess_enabled():
+        return REGISTRY
+    if _merged_registry is None:
+        _merged_registry = CollectorRegistry()
+        MultiProcessCollector(_merged_registry, os.environ["PROMETHEUS_MULTIPROC_DIR"])
+    return _merged_registry
+
+
+def cleanup_dead_processes() -> list[int]:
+    """
+    清理已退出进程留下的 live 模式 gauge 文件
+
+    计数器与直方图的文件会被保留，否则汇总后的计数会出现回退。
+    """
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if not multiprocess_enabled() or not path:
+        return []
+    pids: set[int] = set()
+    for file in Path(path).glob("*.db"):
+        pid = file.stem.rsplit("_", 1)[-1]
+        if pid.isdigit():
+            pids.add(int(pid))
+    dead = sorted(pid for pid in pids if not psutil.pid_exists(pid))
+    for pid in dead:
+        mark_process_dead(pid, path)
+    return dead
+
+
+def mark_current_process_dead() -> None:
+    if multiprocess_enabled() and "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        mark_process_dead(os.getpid())
@@ -0,0 +1,645 @@
+"""
+PromQL 子集查询引擎
+
+直接在本地指标快照上求值，支持：
+
+- 选择器：`name{label="v", label!="v", label=~"re", label!~"re"}`
+- 范围函数：`rate(selector[5m])`、`increase(selector[1h])`
+- 聚合：`sum/avg/max/min/count [by|without (labels)] (expr)`
+- `topk(k, expr)`、`bottomk(k, expr)`
+
+范围函数优先使用 `timeseries` 中按固定间隔采样的历史，
+未被采样的序列则退回到每次查询时记录的快照样本：
+这类序列在第一次查询时只有一个点，需要间隔一段时间再次查询后才有结果，
+需要随时可用的序列应配置在 `timeseries_expressions` 中。
+
+查询可能来自聊天输入，为避免正则拖慢事件循环：
+
+- 正则长度不能超过 `MAX_REGEX_LENGTH`，且选择器必须指定指标名
+- 拒绝可能指数回溯的正则：重复中嵌套可变长的重复或分支、反向引用，
+  无上界的重复不超过 `MAX_REGEX_REPEATS` 个
+- `query` 在工作线程中匹配选择器，超过 `QUERY_TIME_BUDGET` 秒时中止
+"""
+
+from __future__ import annotations
+
+import re
+import time
+import heapq
+import asyncio
+from functools import lru_cache
+from collections import OrderedDict, deque
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, field
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:  # pragma: no cover
+    import sre_parse
+
+from miraita.log import logger
+
+from .registry import MetricCollection, collect_metrics
+from .timeseries import TimeSeriesStore, timeseries_store
+from .metrics import query_history_series_gauge, query_history_points_gauge
+
+AGGREGATIONS = ("sum", "avg", "max", "min", "count")
+RANGE_FUNCTIONS = ("rate", "increase")
+DURATION_UNITS = {
+    "ms": 0.001,
+    "s": 1,
+    "m": 60,
+    "h": 3600,
+    "d": 86400,
+    "w": 604800,
+}
+
+MAX_REGEX_LENGTH = 128
+"""`=~` / `!~` 正则的最大长度"""
+MAX_REGEX_REPEATS = 3
+"""正则中无上界重复（`*`、`+`、`{n,}`）的最大数量"""
+QUERY_TIME_BUDGET = 2.0
+"""`query` 匹配选择器的时间上限（单位：秒）"""
+
+_IDENT = re.compile(r"[a-zA-Z_:][a-zA-Z0-9_:]*")
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+_DURATION = re.compile(r"(\d+)(ms|s|m|h|d|w)")
+_OPERATOR = re.compile(r"=~|!~|!=|=")
+_BARE_VALUE = re.compile(r"[^,}]*")
+_GROUPING = {keyword: re.compile(keyword + r"\b") for keyword in ("by", "without")}
+
+
+class QueryError(ValueError):
+    """查询表达式无法解析或求值"""
+
+
+def _check_backtracking(label: str, pattern: str) -> None:
+    """拒绝可能指数回溯的正则"""
+    unbounded = 0
+
+    def walk(items, repeated: bool) -> None:
+        nonlocal unbounded
+        for op, av in items:
+            op = str(op)
+            if op.endswith("_REPEAT"):
+                low, high, sub = av
+                if repeated and low != high:
+                    raise QueryError(
+                        f"regex for label {label!r} has nested quantifiers"
+                    )
+                if high == sre_parse.MAXREPEAT:
+                    unbounded += 1
+                walk(sub, repeated or high > 1)
+            elif op == "BRANCH":
+                if repeated:
+                    raise QueryError(
+                        f"regex for label {label!r} has alternation inside a quantifier"
+                    )
+                for branch in av[1]:
+                    walk(branch, repeated)
+            elif op == "SUBPATTERN":
+                walk(av[-1], repeated)
+            elif op == "ATOMIC_GROUP":
+                walk(av, repeated)
+            elif op in ("ASSERT", "ASSERT_NOT"):
+                walk(av[1], repeated)
+            elif op.startswith("GROUPREF"):
+                raise QueryError(f"regex for label {label!r} has backreferences")
+
+    walk(sre_parse.parse(pattern), False)
+    if unbounded > MAX_REGEX_REPEATS:
+        raise QueryError(
+            f"regex for label {label!r} has more than {MAX_REGEX_REPEATS} "
+            "unbounded quantifiers"
+        )
+
+
+@dataclass(frozen=True)
+class LabelMatcher:
+    name: str
+    op: str
+    """`=`、`!=`、`=~` 或 `!~`"""
+    value: str
+    regex: re.Pattern[str] | None = field(default=None, compare=False, repr=False)
+
+    @classmethod
+    def create(cls, name: str, op: str, value: str) -> LabelMatcher:
+        regex = None
+        if op in ("=~", "!~"):
+            if len(value) > MAX_REGEX_LENGTH:
+                raise QueryError(
+                    f"regex for label {name!r} exceeds {MAX_REGEX_LENGTH} characters"
+                )
+            try:
+                regex = re.compile(value)
+            except re.error as e:
+                raise QueryError(f"invalid regex {value!r}: {e}") from e
+            _check_backtracking(name, value)
+        return cls(name, op, value, regex)
+
+    def matches(self, value: str) -> bool:
+        """判断标签值是否匹配，缺失的标签视为空字符串"""
+        if self.op == "=":
+            return value == self.value
+        if self.op == "!=":
+            return value != self.value
+        matched = self.regex.fullmatch(value) is not None  # type: ignore
+        return matched if self.op == "=~" else not matched
+
+
+@dataclass(frozen=True)
+class VectorSelector:
+    name: str | None
+    matchers: tuple[LabelMatcher, ...] = ()
+
+    @property
+    def equalities(self) -> dict[str, str]:
+        """可以直接走标签倒排索引的非空等值匹配"""
+        return {m.name: m.value for m in self.matchers if m.op == "=" and m.value}
+
+
+@dataclass(frozen=True)
+class RangeSelector:
+    selector: VectorSelector
+    range: float
+    """时间范围（单位：秒）"""
+
+
+@dataclass(frozen=True)
+class Call:
+    func: str
+    arg: RangeSelector
+
+
+@dataclass(frozen=True)
+class Aggregation:
+    op: str
+    expr: Expr
+    grouping: tuple[str, ...] = ()
+    without: bool = False
+    param: float | None = None
+    """`topk` / `bottomk` 的参数"""
+
+
+Expr = VectorSelector | Call | Aggregation
+
+
+@dataclass
+class Series:
+    labels: dict[str, str]
+    value: float
+
+    @property
+    def name(self) -> str | None:
+        return self.labels.get("__name__")
+
+
+class SampleHistory:
+    """
+    本地保留的样本历史，供范围函数使用
+
+    只记录范围函数的选择器选中的序列：每个新的指标快照中每条序列最多记录一个点，
+    每条序列最多保留 `max_points` 个点，超过 `retention` 秒的点会被丢弃。
+    序列数量不超过 `max_series`，超出时淘汰最久未被记录的序列。
+    """
+
+    def __init__(
+        self, retention: float = 3600, max_points: int = 240, max_series: int = 1000
+    ):
+        self.retention = retention
+        self.max_points = max_points
+        self.max_series = max_series
+        self.evicted = 0
+        """因超出 `max_series` 而被淘汰的序列数量"""
+        self._series: OrderedDict[tuple, deque[tuple[float, float]]] = OrderedDict()
+        self._versions: dict[tuple, int] = {}
+        """各序列最后一次记录时的快照版本"""
+
+    def __len__(self) -> int:
+        return len(self._series)
+
+    @property
+    def points_count(self) -> int:
+        return sum(len(points) for points in self._series.values())
+
+    @staticmethod
+    def key(name: str, labels: dict[str, str]) -> tuple:
+        return (name, *sorted(labels.items()))
+
+    def record(
+        self,
+        coll: MetricCollection,
+        selected: Iterable[Series],
+        now: float | None = None,
+    ) -> None:
+        """记录从快照 `coll` 中选出的序列"""
+        if coll.error:
+            return
+        now = time.time() if now is None else now
+        for series in selected:
+            key = self.key(series.name, _drop_name(series.labels))  # type: ignore
+            if self._versions.get(key) == coll.version:
+                continue
+            self._versions[key] = coll.version
+            points = self._series.get(key)
+            if points is None:
+                points = self._series[key] = deque(maxlen=self.max_points)
+            else:
+                self._series.move_to_end(key)
+            points.append((now, series.value))
+
+        deadline = now - self.retention
+        for key in [k for k, p in self._series.items() if p[-1][0] < deadline]:
+            self._remove(key)
+        while len(self._series) > self.max_series:
+            self._remove(next(iter(self._series)))
+            self.evicted += 1
+
+    def _remove(self, key: tuple) -> None:
+        del self._series[key]
+        self._versions.pop(key, None)
+
+    def points(
+        self, name: str, labels: dict[str, str], start: float
+    ) -> Sequence[tuple[float, float]]:
+        points = self._series.get(self.key(name, labels))
+        if not points:
+            return []
+        return [p for p in points if p[0] >= start]
+
+
+history = SampleHistory()
+query_history_series_gauge.set_function(lambda: len(history))
+query_history_points_gauge.set_function(lambda: history.points_count)
+
+
+class _Parser:
+    def __init__(self, text: str):
+        self.text = text
+        self.pos = 0
+
+    def error(self, message: str) -> QueryError:
+        return QueryError(f"{message} at position {self.pos}: {self.text!r}")
+
+    def skip(self) -> None:
+        while self.pos < len(self.text) and self.text[self.pos].isspace():
+            self.pos += 1
+
+    def peek(self, token: str) -> bool:
+        self.skip()
+        return self.text.startswith(token, self.pos)
+
+    def accept(self, token: str) -> bool:
+        if self.peek(token):
+            self.pos += len(token)
+            return True
+        return False
+
+    def expect(self, token: str) -> None:
+        if not self.accept(token):
+            raise self.error(f"expected {token!r}")
+
+    def match(self, pattern: re.Pattern[str]) -> str | None:
+        self.skip()
+        m = pattern.match(self.text, self.pos)
+        if m is None:
+            return None
+        self.pos = m.end()
+        return m.group()
+
+    def ident(self) -> str:
+        ident = self.match(_IDENT)
+        if ident is None:
+            raise self.error("expected identifier")
+        return ident
+
+    def string(self) -> str:
+        self.skip()
+        quote = self.text[self.pos : self.pos + 1]
+        if quote not in ('"', "'", "`"):
+            # 兼容未加引号的标签值
+            return (self.match(_BARE_VALUE) or "").strip()
+        self.pos += 1
+        chars: list[str] = []
+        while self.pos < len(self.text):
+            char = self.text[self.pos]
+            self.pos += 1
+            if char == quote:
+                return "".join(chars)
+            if char == "\\" and quote != "`" and self.pos < len(self.text):
+                escaped = self.text[self.pos]
+                self.pos += 1
+                chars.append({"n": "\n", "t": "\t"}.get(escaped, escaped))
+            else:
+                chars.append(char)
+        raise self.error("unterminated string")
+
+    def duration(self) -> float:
+        self.skip()
+        total = 0.0
+        start = self.pos
+        while m := _DURATION.match(self.text, self.pos):
+            total += int(m.group(1)) * DURATION_UNITS[m.group(2)]
+            self.pos = m.end()
+        if self.pos == start:
+            raise self.error("expected duration")
+        return total
+
+    def parse(self) -> Expr:
+        expr = self.expr()
+        self.skip()
+        if self.pos != len(self.text):
+            raise self.error("unexpected trailing input")
+        return expr
+
+    def expr(self) -> Expr:
+        self.skip()
+        if self.peek("{"):
+            return self.selector(None)
+
+        ident = self.ident()
+        if ident in AGGREGATIONS:
+            return self.aggregation(ident)
+        if ident in ("topk", "bottomk"):
+            return self.topk(ident)
+        if ident in RANGE_FUNCTIONS:
+            self.expect("(")
+            selector = self.selector(self.ident() if not self.peek("{") else None)
+            self.expect("[")
+            range_ = self.duration()
+            self.expect("]")
+            self.expect(")")
+            return Call(ident, RangeSelector(selector, range_))
+        return self.selector(ident)
+
+    def selector(self, name: str | None) -> VectorSelector:
+        matchers: list[LabelMatcher] = []
+        if self.accept("{"):
+            while not self.accept("}"):
+                label = self.ident()
+                op = self.match(_OPERATOR)
+                if op is None:
+                    raise self.error("expected label matching operator")
+                value = self.string()
+                if label == "__name__" and op == "=":
+                    name = value
+                else:
+                    matchers.append(LabelMatcher.create(label, op, value))
+                if not self.accept(","):
+                    self.expect("}")
+                    break
+        if name is None and not matchers:
+            raise self.error("vector selector must contain at least one matcher")
+        if name is None and any(m.regex is not None for m in matchers):
+            raise self.error("regex matchers require a metric name")
+        return VectorSelector(name, tuple(matchers))
+
+    def grouping(self) -> tuple[tuple[str, ...], bool] | None:
+        for keyword, pattern in _GROUPING.items():
+            if self.match(pattern):
+                self.expect("(")
+                labels: list[str] = []
+                while not self.accept(")"):
+                    labels.append(self.ident())
+                    if not self.accept(","):
+                        self.expect(")")
+                        break
+                return tuple(labels), keyword == "without"
+        return None
+
+    def aggregation(self, op: str) -> Aggregation:
+        grouping = self.grouping()
+        self.expect("(")
+        expr = self.expr()
+        self.expect(")")
+        if grouping is None:
+            grouping = self.grouping()
+        labels, without = grouping or ((), False)
+        return Aggregation(op, expr, labels, without)
+
+    def topk(self, op: str) -> Aggregation:
+        self.expect("(")
+        number = self.match(_NUMBER)
+        if number is None:
+            raise self.error("expected number")
+        self.expect(",")
+        expr = self.expr()
+        self.expect(")")
+        return Aggregation(op, expr, param=float(number))
+
+
+@lru_cache(maxsize=256)
+def parse(query: str) -> Expr:
+    """解析查询表达式，相同的表达式只会被编译一次"""
+    return _Parser(query).parse()
+
+
+def _select(
+    coll: MetricCollection, selector: VectorSelector, deadline: float | None = None
+) -> Iterable[Series]:
+    families = coll.find_by_name(selector.name) if selector.name else coll.metrics
+    equalities = selector.equalities
+    others = [m for m in selector.matchers if not (m.op == "=" and m.value)]
+    for fam in families:
+        for s in fam.filter_samples(equalities):
+            if deadline is not None and time.monotonic() > deadline:
+                raise QueryError(f"query exceeded {QUERY_TIME_BUDGET}s time budget")
+            if selector.name and s.name != selector.name:
+                continue
+            labels = {"__name__": s.name, **s.labels}
+            if all(m.matches(labels.get(m.name, "")) for m in others):
+                yield Series(labels, s.value)
+
+
+def counter_increase(points: Sequence[tuple[float, float]]) -> float:
+    """计算区间内的增量，计数器重置时把重置前的值累加上"""
+    total = 0.0
+    for (_, prev), (_, curr) in zip(points, points[1:]):
+        total += curr - prev if curr >= prev else curr
+    return total
+
+
+def _drop_name(labels: dict[str, str]) -> dict[str, str]:
+    return {k: v for k, v in labels.items() if k != "__name__"}
+
+
+def _is_counter(expr: Expr) -> bool:
+    """表达式的结果是否随时间单调递增"""
+    if isinstance(expr, VectorSelector):
+        return bool(expr.name and expr.name.endswith("_total"))
+    if isinstance(expr, Aggregation):
+        return expr.op in ("sum", "max", "min") and _is_counter(expr.expr)
+    return False
+
+
+def range_selectors(expr: Expr) -> list[VectorSelector]:
+    """表达式中范围函数的选择器，即需要保留历史的序列"""
+    if isinstance(expr, Call):
+        return [expr.arg.selector]
+    if isinstance(expr, Aggregation):
+        return range_selectors(expr.expr)
+    return []
+
+
+def selectors(expr: Expr) -> list[VectorSelector]:
+    """表达式中的所有选择器"""
+    if isinstance(expr, VectorSelector):
+        return [expr]
+    return range_selectors(expr)
+
+
+class Evaluator:
+    def __init__(
+        self,
+        coll: MetricCollection,
+        history: SampleHistory,
+        now: float | None = None,
+        store: TimeSeriesStore | None = None,
+        deadline: float | None = None,
+    ):
+        self.coll = coll
+        self.history = history
+        self.store = store
+        self.now = time.time() if now is None else now
+        self.deadline = deadline
+        """匹配选择器的截止时间（`time.monotonic()`），超过时抛出 `QueryError`"""
+        self._selected: dict[VectorSelector, list[Series]] = {}
+
+    def select(self, selector: VectorSelector) -> list[Series]:
+        """选择器选中的序列，同一选择器只匹配一次"""
+        selected = self._selected.get(selector)
+        if selected is None:
+            selected = list(_select(self.coll, selector, self.deadline))
+            self._selected[selector] = selected
+        return selected
+
+    def prepare(self, expr: Expr) -> None:
+        """预先匹配表达式中的所有选择器，不修改历史，可以在工作线程中执行"""
+        for selector in selectors(expr):
+            self.select(selector)
+
+    def eval(self, expr: Expr) -> list[Series]:
+        if isinstance(expr, VectorSelector):
+            return self.select(expr)
+        if isinstance(expr, Call):
+            return self.call(expr)
+        return self.aggregate(expr)
+
+    def call(self, call: Call) -> list[Series]:
+        selector, range_ = call.arg.selector, call.arg.range
+        result: list[Series] = []
+        start = self.now - range_
+        for series in self.select(selector):
+            name, labels = series.name, _drop_name(series.labels)
+            tracked = self.store.get(name, labels) if self.store else None  # type: ignore
+            points = tracked.points(start) if tracked else []
+            if len(points) < 2:
+                points = self.history.points(name, labels, start)  # type: ignore
+            if len(points) < 2:
+                continue
+            increase = counter_increase(points)
+            if call.func == "rate":
+                elapsed = points[-1][0] - points[0][0]
+                value = increase / elapsed if elapsed > 0 else 0
+            else:
+                value = increase
+            result.append(Series(_drop_name(series.labels), value))
+        return result
+
+    def aggregate(self, agg: Aggregation) -> list[Series]:
+        vector = self.eval(agg.expr)
+        if agg.op in ("topk", "bottomk"):
+            k = int(agg.param or 0)
+            select = heapq.nlargest if agg.op == "topk" else heapq.nsmallest
+            return select(k, vector, key=lambda s: s.value)
+
+        groups: dict[tuple, tuple[dict[str, str], list[float]]] = {}
+        for series in vector:
+            labels = _drop_name(series.labels)
+            if agg.without:
+                group = {k: v for k, v in labels.items() if k not in agg.grouping}
+            else:
+                group = {k: labels[k] for k in agg.grouping if k in labels}
+            key = tuple(sorted(group.items()))
+            groups.setdefault(key, (group, []))[1].append(series.value)
+
+        result: list[Series] = []
+        for group, values in groups.values():
+            if agg.op == "sum":
+                value = sum(values)
+            elif agg.op == "avg":
+                value = sum(values) / len(values)
+            elif agg.op == "max":
+                value = max(values)
+            elif agg.op == "min":
+                value = min(values)
+            else:
+                value = float(len(values))
+            result.append(Series(group, value))
+        return result
+
+
+async def query(expr: str, coll: MetricCollection | None = None) -> list[Series]:
+    """
+    在指标快照上求值查询表达式
+
+    选择器（包括正则）在工作线程中匹配，超过 `QUERY_TIME_BUDGET` 秒时抛出
+    `QueryError`；历史的记录与求值仍在事件循环中进行。
+    """
+    coll = collect_metrics() if coll is None else coll
+    parsed = parse(expr.strip())
+    evaluator = Evaluator(
+        coll,
+        history,
+        store=timeseries_store,
+        deadline=time.monotonic() + QUERY_TIME_BUDGET,
+    )
+    await asyncio.to_thread(evaluator.prepare, parsed)
+    history.record(
+        coll, (s for sel in range_selectors(parsed) for s in evaluator.select(sel))
+    )
+    return evaluator.eval(parsed)
+
+
+def sample(
+    store: TimeSeriesStore,
+    coll: MetricCollection | None = None,
+    now: float | None = None,
+) -> None:
+    """对 `store` 中配置的表达式求值，并将结果写入其历史"""
+    coll = collect_metrics() if coll is None else coll
+    if coll.error:
+        return
+    now = time.time() if now is None else now
+    parsed: list[tuple[str, Expr]] = []
+    for expr in store.expressions:
+        try:
+            parsed.append((expr, parse(expr.strip())))
+        except QueryError as e:
+            logger.warning(f"Failed to parse time series {expr!r}: {e}")
+    evaluator = Evaluator(coll, history, now, store)
+    history.record(
+        coll,
+        (
+            s
+            for _, expr in parsed
+            for sel in range_selectors(expr)
+            for s in evaluator.select(sel)
+        ),
+        now,
+    )
+    for expr, parsed_expr in parsed:
+        try:
+            vector = evaluator.eval(parsed_expr)
+        except QueryError as e:
+            logger.warning(f"Failed to sample time series {expr!r}: {e}")
+            continue
+        counter = _is_counter(parsed_expr)
+        for series in vector:
+            store.record(
+                series.name or expr.strip(),
+                _drop_name(series.labels),
+                now,
+                series.value,
+                counter,
+            )
@@ -9,16 +9,17 @@ from .schema import (
     MatcherStats,
     MatcherStatsResponse,
     SystemMetricsResponse,
+    SlowCallbackInfo,
+    LoopStatsResponse,
 )
-from .metrics import (
-    miraita_start_at_gauge,
-    bot_nums_gauge,
-    bot_shutdown_counter,
-    received_messages_counter,
-    sent_messages_counter,
-    matcher_calling_counter,
-    matcher_duration_histogram,
-)
+from .stats import StatsIndex, stats_index
+from .registry import collect_metrics
+from .multiprocess import multiprocess_enabled
+from .loop import loop_monitor
+from .config import RECEIVED_MESSAGES_EXPR, SENT_MESSAGES_EXPR
+from .promql import counter_increase
+from .metrics import miraita_start_at_gauge
+from .timeseries import timeseries_store
 
 
 def format_large_number(num: float) -> str:
@@ -38,88 +39,76 @@ def format_large_number(num: float) -> str:
         return f"{num:.0f}"
 
 
+def current_stats() -> StatsIndex:
+    """当前使用的统计索引，多进程模式下从汇总后的指标重建"""
+    if multiprocess_enabled():
+        return StatsIndex.from_collection(collect_metrics())
+    return stats_index
+
+
 def get_bot_status() -> BotStatusResponse:
     """获取机器人状态信息"""
     try:
-        bot_samples = list(bot_nums_gauge.collect())[0].samples
-        online_bots = [sample for sample in bot_samples if sample.value > 0]
-
-        shutdown_samples = list(bot_shutdown_counter.collect())[0].samples
-        shutdown_counts = {}
-        for sample in shutdown_samples:
-            if "_total" in sample.name:
-                bot_id = sample.labels.get("bot_id", "unknown")
-                platform = sample.labels.get("platform", "unknown")
-                bot_key = f"{bot_id}_{platform}"
-                shutdown_counts[bot_key] = int(sample.value)
-
-        bots = []
-        for bot_sample in online_bots:
-            bot_id = bot_sample.labels["bot_id"]
-            platform = bot_sample.labels["platform"]
-            bot_key = f"{bot_id}_{platform}"
-            shutdown_count = shutdown_counts.get(bot_key, 0)
-
-            bots.append(
-                BotInfo(
-                    bot_id=bot_id,
-                    platform=platform,
-                    status="online",
-                    shutdown_count=shutdown_count,
-                )
+        stats_index = current_stats()
+        online_bots = stats_index.online_bots()
+
+        bots = [
+            BotInfo(
+                bot_id=bot_id,
+                platform=platform,
+                status="online",
+                shutdown_count=int(stats_index.shutdowns.get((bot_id, platform), 0)),
             )
+            for bot_id, platform in online_bots
+        ]
 
         return BotStatusResponse(total_bots=len(online_bots), bots=bots)
     except Exception as e:
         return BotStatusResponse(total_bots=0, bots=[], error=str(e))
 
 
+def get_rate_per_minute(expr: str, window: float = 3600) -> float | None:
+    """
+    从进程内历史计算 `expr` 最近 `window` 秒内的平均每分钟增量
+
+    `expr` 需要在 `timeseries_expressions` 中配置，没有足够的历史时返回 `None`
+    """
+    series = timeseries_store.get(expr, {})
+    if series is None:
+        return None
+    points = series.points(time.time() - window)
+    if len(points) < 2:
+        return None
+    elapsed = points[-1][0] - points[0][0]
+    if elapsed <= 0:
+        return None
+    return counter_increase(points) / elapsed * 60
+
+
 def get_message_stats() -> MessageStatsResponse:
     """获取消息统计信息"""
     try:
-        received_samples = list(received_messages_counter.collect())[0].samples
-        received_total = 0
-        received_by_bot = {}
-
-        for sample in received_samples:
-            if sample.name.endswith("_total"):
-                received_total += sample.value
-                bot_id = sample.labels.get("bot_id", "unknown")
-                platform = sample.labels.get("platform", "unknown")
-
-                bot_key = f"{bot_id}({platform})"
-                if bot_key not in received_by_bot:
-                    received_by_bot[bot_key] = BotMessageStats(
-                        bot_id=bot_id,
-                        platform=platform,
-                        count=0,
-                    )
-                received_by_bot[bot_key].count += sample.value
-
-        sent_samples = list(sent_messages_counter.collect())[0].samples
-        sent_total = 0
-        sent_by_bot = {}
-
-        for sample in sent_samples:
-            if sample.name.endswith("_total"):
-                sent_total += sample.value
-                bot_id = sample.labels.get("bot_id", "unknown")
-                platform = sample.labels.get("platform", "unknown")
-
-                bot_key = f"{bot_id}({platform})"
-                if bot_key not in sent_by_bot:
-                    sent_by_bot[bot_key] = BotMessageStats(
-                        bot_id=bot_id,
-                        platform=platform,
-                        count=0,
-                    )
-                sent_by_bot[bot_key].count += sample.value
+        stats_index = current_stats()
+        received_by_bot = {
+            f"{bot_id}({platform})": BotMessageStats(
+                bot_id=bot_id, platform=platform, count=count
+            )
+            for (bot_id, platform), count in stats_index.received.items()
+        }
+        sent_by_bot = {
+            f"{bot_id}({platform})": BotMessageStats(
+                bot_id=bot_id, platform=platform, count=count
+            )
+            for (bot_id, platform), count in stats_index.sent.items()
+        }
 
         return MessageStatsResponse(
-            total_received=received_total,
-            total_sent=sent_total,
+            total_received=stats_index.received_total,
+            total_sent=stats_index.sent_total,
             received_by_bot=received_by_bot,
             sent_by_bot=sent_by_bot,
+            received_per_minute=get_rate_per_minute(RECEIVED_MESSAGES_EXPR),
+            sent_per_minute=get_rate_per_minute(SENT_MESSAGES_EXPR),
         )
     except Exception as e:
         return MessageStatsResponse(
@@ -134,55 +123,21 @@ def get_message_stats() -> MessageStatsResponse:
 def get_matcher_stats(limit: int = 10) -> MatcherStatsResponse:
     """获取匹配器统计信息"""
     try:
-        calling_samples = list(matcher_calling_counter.collect())[0].samples
-
-        duration_data = list(matcher_duration_histogram.collect())
-        duration_samples = []
-        for metric_family in duration_data:
-            for sample in metric_family.samples:
-                # 获取 _sum 指标（总执行时间）
-                if sample.name.endswith("_sum"):
-                    duration_samples.append(sample)
-
-        matcher_stats = {}
-
-        for sample in calling_samples:
-            if sample.name.endswith("_total"):
-                plugin_name = sample.labels.get("plugin_name", "unknown")
-                call_count = sample.value
-
-                if plugin_name not in matcher_stats:
-                    matcher_stats[plugin_name] = MatcherStats(
-                        plugin_name=plugin_name,
-                        call_count=0,
-                        total_duration=0,
-                        avg_duration=0,
-                    )
-
-                matcher_stats[plugin_name].call_count += call_count
-
-        for sample in duration_samples:
-            plugin_name = sample.labels.get("plugin_name", "unknown")
-
-            if plugin_name in matcher_stats:
-                matcher_stats[plugin_name].total_duration += sample.value
-
-        for matcher_name, stats in matcher_stats.items():
-            if stats.call_count > 0:
-                stats.avg_duration = stats.total_duration / stats.call_count
-            else:
-                stats.avg_duration = 0
-
-        sorted_matchers = sorted(
-            matcher_stats.values(), key=lambda x: x.call_count, reverse=True
-        )
-
-        total_calls = sum(m.call_count for m in sorted_matchers)
+        stats_index = current_stats()
+        top_matchers = [
+            MatcherStats(
+                plugin_name=plugin_name,
+                call_count=totals.calls,
+                total_duration=totals.duration,
+                avg_duration=totals.avg_duration,
+            )
+            for plugin_name, totals in stats_index.top_matchers(limit)
+        ]
 
         return MatcherStatsResponse(
-            total_matchers=len(sorted_matchers),
-            top_matchers=sorted_matchers[:limit],
-            total_calls=total_calls,
+            total_matchers=len(stats_index.matchers),
+            top_matchers=top_matchers,
+            total_calls=stats_index.matcher_calls,
         )
     except Exception as e:
         return MatcherStatsResponse(
@@ -193,8 +148,17 @@ def get_matcher_stats(limit: int = 10) -> MatcherStatsResponse:
 def get_system_metrics() -> SystemMetricsResponse:
     """获取系统指标"""
     try:
-        start_time_samples = list(miraita_start_at_gauge.collect())[0].samples
-        if start_time_samples:
+        if multiprocess_enabled():
+            start_time_samples = [
+                s
+                for fam in collect_metrics().find_by_name("miraita_start_at")
+                for s in fam.samples
+                if s.name == "miraita_start_at"
+            ]
+        else:
+            start_time_samples = list(miraita_start_at_gauge.collect())[0].samples
+        # 启动前计量器尚未设置，值为 0
+        if start_time_samples and start_time_samples[0].value:
             start_timestamp = start_time_samples[0].value
             current_time = time.time()
             uptime_seconds = current_time - start_timestamp
@@ -206,14 +170,49 @@ def get_system_metrics() -> SystemMetricsResponse:
         else:
             uptime_str = "未知"
             start_time_formatted = "未知"
-            uptime_seconds = 0
+            start_timestamp = uptime_seconds = 0
 
         return SystemMetricsResponse(
             uptime=uptime_str,
             start_time=start_time_formatted,
             uptime_seconds=uptime_seconds,
+            start_timestamp=start_timestamp,
         )
     except Exception as e:
         return SystemMetricsResponse(
             uptime="未知", start_time="未知", uptime_seconds=0, error=str(e)
         )
+
+
+def get_loop_stats() -> LoopStatsResponse:
+    """获取事件循环健康状况"""
+    try:
+        recent = [
+            SlowCallbackInfo(
+                plugin_id=slow.plugin_id,
+                location=slow.location,
+                duration=slow.duration,
+                occurred_at=datetime.fromtimestamp(slow.timestamp).strftime(
+                    "%Y-%m-%d %H:%M:%S"
+                ),
+            )
+            for slow in reversed(loop_monitor.recent)
+        ]
+        return LoopStatsResponse(
+            last_lag=loop_monitor.last_lag,
+            max_lag=loop_monitor.max_lag,
+            tasks=loop_monitor.tasks,
+            slow_by_plugin=dict(
+                sorted(loop_monitor.slow_counts.items(), key=lambda x: -x[1])
+            ),
+            recent_slow_callbacks=recent,
+        )
+    except Exception as e:
+        return LoopStatsResponse(
+            last_lag=0,
+            max_lag=0,
+            tasks=0,
+            slow_by_plugin={},
+            recent_slow_callbacks=[],
+            error=str(e),
+        )
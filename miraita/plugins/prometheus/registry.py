@@ -1,11 +1,17 @@
 from __future__ import annotations
 
+import time
 from typing import Any
-from dataclasses import dataclass, asdict
-from prometheus_client import REGISTRY
+from itertools import count
+from functools import cached_property
+from dataclasses import dataclass, asdict, field
 from prometheus_client.samples import Sample
 
-from miraita import logger
+from miraita.log import logger
+
+from .config import config
+from .buffer import counter_buffer
+from .multiprocess import get_registry
 
 
 @dataclass
@@ -21,12 +27,61 @@ class MetricFamily:
         """根据标签过滤样本"""
         if not labels:
             return self.samples
+        postings: list[list[int]] = []
+        for pair in labels.items():
+            posting = self.label_index.get(pair)
+            if not posting:
+                return []
+            postings.append(posting)
+        postings.sort(key=len)
+        others = [set(posting) for posting in postings[1:]]
         return [
-            s
-            for s in self.samples
-            if all(s.labels.get(k) == v for k, v in labels.items())
+            self.samples[i] for i in postings[0] if all(i in other for other in others)
         ]
 
+    @cached_property
+    def label_index(self) -> dict[tuple[str, str], list[int]]:
+        """标签倒排索引：`(标签名, 标签值)` -> 样本下标（升序）"""
+        index: dict[tuple[str, str], list[int]] = {}
+        for i, sample in enumerate(self.samples):
+            for pair in sample.labels.items():
+                index.setdefault(pair, []).append(i)
+        return index
+
+
+class NameTrie:
+    """指标名前缀树，节点中保存以该路径为名称的指标族下标"""
+
+    __slots__ = ("children", "indices")
+
+    def __init__(self):
+        self.children: dict[str, NameTrie] = {}
+        self.indices: list[int] = []
+
+    def insert(self, name: str, index: int) -> None:
+        node = self
+        for char in name:
+            node = node.children.setdefault(char, NameTrie())
+        node.indices.append(index)
+
+    def walk(self, prefix: str) -> NameTrie | None:
+        node = self
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return node
+
+    def collect(self) -> list[int]:
+        """收集子树中的所有下标"""
+        result: list[int] = []
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            result.extend(node.indices)
+            stack.extend(node.children.values())
+        return result
+
 
 @dataclass
 class MetricCollection:
@@ -34,6 +89,27 @@ class MetricCollection:
 
     metrics: list[MetricFamily]
     error: str | None = None
+    version: int = 0
+    """快照版本，每次重新采集时递增"""
+    collected_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.collected_at
+
+    @cached_property
+    def name_trie(self) -> NameTrie:
+        trie = NameTrie()
+        for i, m in enumerate(self.metrics):
+            trie.insert(m.name, i)
+        return trie
+
+    @cached_property
+    def type_index(self) -> dict[str, list[MetricFamily]]:
+        index: dict[str, list[MetricFamily]] = {}
+        for m in self.metrics:
+            index.setdefault(m.type, []).append(m)
+        return index
 
     def to_dict(self) -> dict[str, Any]:
         return {
@@ -74,18 +150,26 @@ class MetricCollection:
         )
 
     def find_by_name(self, metric_name: str) -> list[MetricFamily]:
-        return [
-            m
-            for m in self.metrics
-            if (
-                m.name == metric_name
-                or m.name.startswith(metric_name + "_")
-                or metric_name.startswith(m.name + "_")
-            )
-        ]
+        """
+        查找名称为 `metric_name`、以 `metric_name_` 开头，
+        或是 `metric_name` 以 `名称_` 开头（如 `xxx_total` 对应 `xxx`）的指标族
+        """
+        matched: set[int] = set()
+        node = self.name_trie
+        for i, char in enumerate(metric_name):
+            if char == "_" and node.indices:
+                matched.update(node.indices)
+            node = node.children.get(char)
+            if node is None:
+                break
+        else:
+            matched.update(node.indices)
+            if under := node.children.get("_"):
+                matched.update(under.collect())
+        return [self.metrics[i] for i in sorted(matched)]
 
     def find_by_type(self, metric_type: str) -> list[MetricFamily]:
-        return [m for m in self.metrics if m.type == metric_type]
+        return list(self.type_index.get(metric_type, []))
 
     def search(self, keyword: str) -> list[dict[str, Any]]:
         kw = keyword.lower()
@@ -101,11 +185,35 @@ class MetricCollection:
         ]
 
 
-def collect_metrics() -> MetricCollection:
+_versions = count(1)
+_snapshot: MetricCollection | None = None
+
+
+def collect_metrics(max_age: float | None = None) -> MetricCollection:
+    """
+    获取指标快照
+
+    快照在 `max_age`（默认为配置项 `registry_snapshot_ttl`）秒内被复用，
+    同一条命令或请求中的多次查询共享同一份快照及其索引。
+    """
+    global _snapshot
+
+    if max_age is None:
+        max_age = config.registry_snapshot_ttl
+    if _snapshot is not None and _snapshot.age < max_age:
+        return _snapshot
+
+    coll = _collect()
+    _snapshot = None if coll.error else coll
+    return coll
+
+
+def _collect() -> MetricCollection:
+    counter_buffer.flush()
     try:
         families: list[MetricFamily] = []
 
-        for fam in REGISTRY.collect():
+        for fam in get_registry().collect():
             families.append(
                 MetricFamily(
                     name=fam.name,
@@ -116,7 +224,7 @@ def collect_metrics() -> MetricCollection:
             )
 
         logger.debug(f"Collected {len(families)} metric families")
-        return MetricCollection(families)
+        return MetricCollection(families, version=next(_versions))
 
     except Exception as e:
         logger.exception("Failed to collect metrics")
@@ -188,18 +296,14 @@ def parse_metric_filter(metric_query: str) -> tuple[str, dict[str, str]]:
         http_requests_total{method="GET",code="200"}
         ```
     """
+    from .promql import VectorSelector, parse
+
     try:
-        if "{" not in metric_query:
-            return metric_query.strip(), {}
-
-        name, filter_part = metric_query.split("{", 1)
-        filter_part = filter_part.rstrip("}")
-        labels = {}
-        for pair in filter_part.split(","):
-            if "=" in pair:
-                k, v = pair.split("=", 1)
-                labels[k.strip()] = v.strip("\"'")
-        return name.strip(), labels
+        selector = parse(metric_query.strip())
+        if not isinstance(selector, VectorSelector):
+            raise ValueError("only vector selectors are supported")
+        labels = {m.name: m.value for m in selector.matchers if m.op == "="}
+        return selector.name or "", labels
     except Exception as e:
         logger.error(f"Failed to parse metric filter: {e}")
         return metric_query.strip(), {}
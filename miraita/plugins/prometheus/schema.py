@@ -29,6 +29,10 @@ class MessageStatsResponse:
     total_sent: float
     received_by_bot: dict[str, BotMessageStats]
     sent_by_bot: dict[str, BotMessageStats]
+    received_per_minute: float | None = None
+    """最近一小时平均每分钟接收的消息数，没有足够的历史时为 `None`"""
+    sent_per_minute: float | None = None
+    """最近一小时平均每分钟发送的消息数，没有足够的历史时为 `None`"""
     error: str | None = None
 
 
@@ -48,9 +52,28 @@ class MatcherStatsResponse:
     error: str | None = None
 
 
+@dataclass
+class SlowCallbackInfo:
+    plugin_id: str
+    location: str
+    duration: float
+    occurred_at: str
+
+
+@dataclass
+class LoopStatsResponse:
+    last_lag: float
+    max_lag: float
+    tasks: int
+    slow_by_plugin: dict[str, int]
+    recent_slow_callbacks: list[SlowCallbackInfo]
+    error: str | None = None
+
+
 @dataclass
 class SystemMetricsResponse:
     uptime: str
     start_time: str
     uptime_seconds: float
+    start_timestamp: float = 0
     error: str | None = None
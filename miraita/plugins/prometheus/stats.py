@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import heapq
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from arclet.entari import keeping
+
+if TYPE_CHECKING:
+    from .registry import MetricCollection
+
+
+@dataclass
+class MatcherTotals:
+    calls: float = 0
+    """调用次数"""
+    timed_calls: float = 0
+    """记录了耗时的调用次数"""
+    duration: float = 0
+    """记录到的总耗时（单位：秒）"""
+
+    @property
+    def avg_duration(self) -> float:
+        return self.duration / self.timed_calls if self.timed_calls > 0 else 0
+
+
+class StatsIndex:
+    """
+    `/metrics` 命令使用的统计索引
+
+    与 Prometheus 指标同步增量维护按机器人、按插件汇总的数据，
+    查询时无需遍历所有时间序列（例如按用户拆分的消息计数器）。
+    机器人以 `(bot_id, platform)` 为键，字典保持首次出现的顺序。
+    """
+
+    def __init__(self):
+        self.received: dict[tuple[str, str], float] = {}
+        self.sent: dict[tuple[str, str], float] = {}
+        self.received_total: float = 0
+        self.sent_total: float = 0
+        self.bots: dict[tuple[str, str], float] = {}
+        """在线机器人数量，与 `bot_nums` 指标一致"""
+        self.shutdowns: dict[tuple[str, str], float] = {}
+        self.matchers: dict[str, MatcherTotals] = {}
+        self.matcher_calls: float = 0
+
+    def record_received(self, bot_id: str, platform: str, amount: float = 1) -> None:
+        key = (bot_id, platform)
+        self.received[key] = self.received.get(key, 0) + amount
+        self.received_total += amount
+
+    def record_sent(self, bot_id: str, platform: str, amount: float = 1) -> None:
+        key = (bot_id, platform)
+        self.sent[key] = self.sent.get(key, 0) + amount
+        self.sent_total += amount
+
+    def record_bot(self, bot_id: str, platform: str, delta: float) -> None:
+        key = (bot_id, platform)
+        self.bots[key] = self.bots.get(key, 0) + delta
+
+    def record_shutdown(self, bot_id: str, platform: str) -> None:
+        key = (bot_id, platform)
+        self.shutdowns[key] = self.shutdowns.get(key, 0) + 1
+
+    def record_matcher(self, plugin_name: str, duration: float | None = None) -> None:
+        """记录一次调用，`duration` 为 `None` 表示本次调用未计时"""
+        totals = self._matcher(plugin_name)
+        totals.calls += 1
+        self.matcher_calls += 1
+        if duration is not None:
+            totals.timed_calls += 1
+            totals.duration += duration
+
+    @classmethod
+    def from_collection(cls, coll: MetricCollection) -> StatsIndex:
+        """
+        从指标快照重建统计索引
+
+        多进程模式下每个进程只维护自己的索引，查询时改为从汇总后的指标重建
+        """
+        index = cls()
+        for fam in coll.metrics:
+            for s in fam.samples:
+                labels = s.labels
+                if s.name == "miraita_received_messages_total":
+                    index.record_received(labels["bot_id"], labels["platform"], s.value)
+                elif s.name == "miriata_sent_messages_total":
+                    index.record_sent(labels["bot_id"], labels["platform"], s.value)
+                elif s.name == "bot_nums":
+                    index.record_bot(labels["bot_id"], labels["platform"], s.value)
+                elif s.name == "bot_shutdown_total":
+                    key = (labels["bot_id"], labels["platform"])
+                    index.shutdowns[key] = index.shutdowns.get(key, 0) + s.value
+                elif s.name == "nonebot_matcher_calling_total":
+                    index._matcher(labels["plugin_name"]).calls += s.value
+                    index.matcher_calls += s.value
+                elif s.name == "miraita_matcher_duration_seconds_count":
+                    index._matcher(labels["plugin_name"]).timed_calls += s.value
+                elif s.name == "miraita_matcher_duration_seconds_sum":
+                    index._matcher(labels["plugin_name"]).duration += s.value
+        return index
+
+    def _matcher(self, plugin_name: str) -> MatcherTotals:
+        totals = self.matchers.get(plugin_name)
+        if totals is None:
+            totals = self.matchers[plugin_name] = MatcherTotals()
+        return totals
+
+    def online_bots(self) -> list[tuple[str, str]]:
+        return [key for key, value in self.bots.items() if value > 0]
+
+    def top_matchers(self, limit: int) -> list[tuple[str, MatcherTotals]]:
+        """调用次数最多的 `limit` 个插件，次数相同时保持首次出现的顺序"""
+        return heapq.nlargest(
+            limit, self.matchers.items(), key=lambda item: item[1].calls
+        )
+
+
+stats_index = keeping("stats_index", obj_factory=StatsIndex)
@@ -1,33 +1,82 @@
-import time
+import asyncio
+from itertools import count
+from time import perf_counter_ns
+from dataclasses import dataclass
+from contextvars import ContextVar
+from contextlib import AsyncExitStack
+
 from arclet.letoderea import Propagator
 from arclet.entari import Session
 
+from .stats import stats_index
 from .metrics import (
     matcher_calling_counter,
     matcher_duration_histogram,
+    matcher_outcome_counter,
+)
+
+TIMEOUT_EXCEPTIONS = (asyncio.CancelledError, asyncio.TimeoutError, TimeoutError)
+
+
+@dataclass
+class Invocation:
+    """单次调用的计时状态"""
+
+    owner: "RecordRunningTime"
+    """创建该状态的传播器，嵌套的其他传播器不会结束它"""
+    start: int | None
+    """开始时间（`perf_counter_ns`），未被抽样计时时为 `None`"""
+    finished: bool = False
+
+
+_current_invocation: ContextVar[Invocation | None] = ContextVar(
+    "current_invocation", default=None
 )
 
 
 class RecordRunningTime(Propagator):
-    """A propagator to record running time."""
+    """
+    A propagator to record running time.
+
+    计时状态保存在上下文变量中，同一订阅者的并发调用互不干扰；
+    `sample_rate` 大于 1 时每 N 次调用只计时一次，调用次数与结果仍全部统计。
+    """
 
-    def __init__(self, name: str):
+    def __init__(self, name: str, sample_rate: int = 1):
         self.name = name
-        self.start_time: float | None = None
-        self.end_time: float | None = None
+        self.sample_rate = max(sample_rate, 1)
+        self._calls = count()
 
-    async def prepare(self):
+    async def prepare(self, stack: AsyncExitStack, session: Session | None = None):
         """Prepare the propagator by setting the start time."""
-        self.start_time = time.time()
-
-    async def finish(self, session: Session | None = None):
-        """Finish the propagator by setting the end time."""
-        self.end_time = time.time()
-        if session and self.start_time and self.end_time:
-            matcher_calling_counter.labels(self.name).inc()
-            matcher_duration_histogram.labels(self.name).observe(
-                self.end_time - self.start_time
-            )
+        if session is None:
+            return
+        sampled = next(self._calls) % self.sample_rate == 0
+        invocation = Invocation(self, perf_counter_ns() if sampled else None)
+        token = _current_invocation.set(invocation)
+
+        async def on_exit(exc_type, exc, tb):
+            _current_invocation.reset(token)
+            if exc is not None and not invocation.finished:
+                outcome = "timeout" if isinstance(exc, TIMEOUT_EXCEPTIONS) else "error"
+                matcher_outcome_counter.labels(self.name, outcome).inc()
+            return False
+
+        stack.push_async_exit(on_exit)
+
+    async def finish(self):
+        """Finish the propagator by recording the elapsed time."""
+        invocation = _current_invocation.get()
+        if invocation is None or invocation.owner is not self or invocation.finished:
+            return
+        invocation.finished = True
+        duration = None
+        if invocation.start is not None:
+            duration = (perf_counter_ns() - invocation.start) / 1e9
+            matcher_duration_histogram.labels(self.name).observe(duration)
+        matcher_calling_counter.labels(self.name).inc()
+        matcher_outcome_counter.labels(self.name, "success").inc()
+        stats_index.record_matcher(self.name, duration)
 
     def compose(self):
         yield self.prepare, True, 0
@@ -0,0 +1,238 @@
+import os
+import time
+from dataclasses import dataclass
+
+import psutil
+from arclet.entari import keeping
+from prometheus_client.registry import Collector
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from .multiprocess import get_registry
+
+
+@dataclass
+class CPUStats:
+    usage: float
+    """总占用百分比，取值范围 [0, 100]"""
+    per_core: list[float]
+    """各逻辑核心的占用百分比"""
+    freq: float
+    """当前时钟频率（单位：MHz），无法获取时为 0"""
+    physical_cores: int
+    logical_cores: int
+
+
+@dataclass
+class MemoryStats:
+    """内存或 Swap 的用量（单位：字节）"""
+
+    total: int
+    used: int
+    available: int
+
+
+@dataclass
+class DiskStats:
+    """挂载点的用量（单位：字节）"""
+
+    mountpoint: str
+    total: int
+    used: int
+    free: int
+
+
+@dataclass
+class NetworkStats:
+    """所有网卡的累计收发量"""
+
+    bytes_sent: int
+    bytes_recv: int
+    packets_sent: int
+    packets_recv: int
+
+
+@dataclass
+class ProcessStats:
+    """当前进程的资源占用"""
+
+    rss: int
+    """常驻内存（单位：字节）"""
+    fds: int
+    """打开的文件描述符数量，Windows 下为句柄数"""
+    threads: int
+    cpu_percent: float
+
+
+@dataclass
+class StatusSnapshot:
+    """一次采集得到的系统状态"""
+
+    timestamp: float
+    cpu: CPUStats
+    memory: MemoryStats
+    swap: MemoryStats
+    disks: list[DiskStats]
+    network: NetworkStats
+    process: ProcessStats
+
+    def disk(self, mountpoint: str) -> DiskStats | None:
+        return next((d for d in self.disks if d.mountpoint == mountpoint), None)
+
+
+def _disk_stats(mounts: list[str]) -> list[DiskStats]:
+    disks: list[DiskStats] = []
+    for mountpoint in mounts:
+        try:
+            usage = psutil.disk_usage(mountpoint)
+        except OSError:
+            continue
+        disks.append(DiskStats(mountpoint, usage.total, usage.used, usage.free))
+    return disks
+
+
+def take_snapshot(
+    mounts: list[str], process: psutil.Process | None = None
+) -> StatusSnapshot:
+    """
+    采集一次系统状态
+
+    每项数据只调用一次 psutil，CPU 占用率取距上次采集以来的平均值，
+    进程信息在 `oneshot` 中批量读取。
+    """
+    per_core = psutil.cpu_percent(interval=None, percpu=True)
+    freq = psutil.cpu_freq()
+    memory = psutil.virtual_memory()
+    swap = psutil.swap_memory()
+    network = psutil.net_io_counters()
+    process = process or psutil.Process()
+    with process.oneshot():
+        rss = process.memory_info().rss
+        fds = process.num_fds() if os.name == "posix" else process.num_handles()
+        threads = process.num_threads()
+        process_cpu = process.cpu_percent(interval=None)
+
+    return StatusSnapshot(
+        timestamp=time.time(),
+        cpu=CPUStats(
+            usage=round(sum(per_core) / len(per_core), 1) if per_core else 0,
+            per_core=per_core,
+            freq=freq.current if freq else 0,
+            physical_cores=psutil.cpu_count(logical=False) or len(per_core),
+            logical_cores=len(per_core),
+        ),
+        memory=MemoryStats(memory.total, memory.used, memory.available),
+        swap=MemoryStats(swap.total, swap.used, swap.free),
+        disks=_disk_stats(mounts),
+        network=NetworkStats(
+            network.bytes_sent,
+            network.bytes_recv,
+            network.packets_sent,
+            network.packets_recv,
+        ),
+        process=ProcessStats(rss, fds, threads, process_cpu),
+    )
+
+
+class SystemSampler:
+    """
+    系统状态采样器
+
+    由后台任务每隔 `system_sample_interval` 秒采集一次，
+    `/status` 与指标抓取都读取最近一次的结果，不再各自调用 psutil。
+    """
+
+    def __init__(self):
+        self.mounts: list[str] = ["/"]
+        self._latest: StatusSnapshot | None = None
+        self._process = psutil.Process()
+
+    def sample(self) -> StatusSnapshot:
+        self._latest = take_snapshot(self.mounts, self._process)
+        return self._latest
+
+    def latest(self) -> StatusSnapshot:
+        """最近一次采集的结果，尚未采集过时立即采集一次"""
+        return self._latest or self.sample()
+
+
+class SystemCollector(Collector):
+    """将最近一次的系统状态导出为指标"""
+
+    def __init__(self, sampler: SystemSampler):
+        self.sampler = sampler
+
+    def collect(self):
+        snapshot = self.sampler.latest()
+
+        cpu = GaugeMetricFamily(
+            "miraita_system_cpu_usage_ratio", "CPU usage ratio", labels=["core"]
+        )
+        cpu.add_metric(["total"], snapshot.cpu.usage / 100)
+        for core, usage in enumerate(snapshot.cpu.per_core):
+            cpu.add_metric([str(core)], usage / 100)
+        yield cpu
+        yield GaugeMetricFamily(
+            "miraita_system_cpu_frequency_hertz",
+            "Current CPU frequency in hertz",
+            value=snapshot.cpu.freq * 1_000_000,
+        )
+
+        memory = GaugeMetricFamily(
+            "miraita_system_memory_bytes",
+            "Memory usage in bytes",
+            labels=["type", "state"],
+        )
+        for name, stats in (("ram", snapshot.memory), ("swap", snapshot.swap)):
+            memory.add_metric([name, "total"], stats.total)
+            memory.add_metric([name, "used"], stats.used)
+            memory.add_metric([name, "available"], stats.available)
+        yield memory
+
+        disk = GaugeMetricFamily(
+            "miraita_system_disk_bytes",
+            "Disk usage of each mount point in bytes",
+            labels=["mountpoint", "state"],
+        )
+        for stats in snapshot.disks:
+            disk.add_metric([stats.mountpoint, "total"], stats.total)
+            disk.add_metric([stats.mountpoint, "used"], stats.used)
+            disk.add_metric([stats.mountpoint, "free"], stats.free)
+        yield disk
+
+        network_bytes = CounterMetricFamily(
+            "miraita_system_network_bytes",
+            "Bytes transferred over all network interfaces",
+            labels=["direction"],
+        )
+        network_bytes.add_metric(["sent"], snapshot.network.bytes_sent)
+        network_bytes.add_metric(["recv"], snapshot.network.bytes_recv)
+        yield network_bytes
+        network_packets = CounterMetricFamily(
+            "miraita_system_network_packets",
+            "Packets transferred over all network interfaces",
+            labels=["direction"],
+        )
+        network_packets.add_metric(["sent"], snapshot.network.packets_sent)
+        network_packets.add_metric(["recv"], snapshot.network.packets_recv)
+        yield network_packets
+
+        yield GaugeMetricFamily(
+            "miraita_system_snapshot_timestamp_seconds",
+            "Unix time of the system status snapshot",
+            value=snapshot.timestamp,
+        )
+
+
+def _register_collector() -> SystemCollector:
+    # 多进程模式下注册到汇总用的注册表，与其他进程的指标一同输出
+    collector = SystemCollector(system_sampler)
+    get_registry().register(collector)
+    return collector
+
+
+system_sampler = keeping("system_sampler", obj_factory=SystemSampler)
+system_collector = keeping(
+    "system_collector",
+    obj_factory=_register_collector,
+    dispose=lambda collector: get_registry().unregister(collector),
+)
@@ -0,0 +1,229 @@
+import math
+from array import array
+from collections.abc import Iterator, Sequence
+
+from arclet.entari import keeping
+
+from .metrics import (
+    timeseries_series_gauge,
+    timeseries_memory_gauge,
+    timeseries_dropped_gauge,
+)
+
+ROLLUP_COLUMNS = {"min": 1, "max": 2, "avg": 3}
+
+
+class RingBuffer:
+    """
+    定长环形缓冲区
+
+    每一列是一个预先分配好的 `array("d")`，每个点固定占用 `8 × 列数` 字节，
+    写满后覆盖最旧的点。
+    """
+
+    def __init__(self, capacity: int, columns: int):
+        self.capacity = max(capacity, 1)
+        self.columns = [array("d", bytes(8 * self.capacity)) for _ in range(columns)]
+        self._head = 0
+        """下一个写入位置"""
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        return sum(col.itemsize * len(col) for col in self.columns)
+
+    def append(self, *row: float) -> tuple[float, ...] | None:
+        """追加一个点，缓冲区已满时返回被覆盖的最旧的点"""
+        head = self._head
+        evicted = None
+        if self._size == self.capacity:
+            evicted = tuple(col[head] for col in self.columns)
+        else:
+            self._size += 1
+        for col, value in zip(self.columns, row):
+            col[head] = value
+        self._head = (head + 1) % self.capacity
+        return evicted
+
+    def rows(self) -> Iterator[tuple[float, ...]]:
+        """按时间顺序遍历所有点"""
+        start = (self._head - self._size) % self.capacity
+        for i in range(self._size):
+            idx = (start + i) % self.capacity
+            yield tuple(col[idx] for col in self.columns)
+
+
+class TimeSeries:
+    """
+    单条时间序列的两级存储
+
+    - 原始层：采样得到的 `(时间, 值)`
+    - 降采样层：原始层淘汰的点按 `rollup_resolution` 聚合为 `(时间, 最小, 最大, 平均)`，
+      时间取桶内最后一个点的时间
+
+    两层都是定长的环形缓冲区，单条序列占用的内存在创建时即已确定。
+    """
+
+    def __init__(
+        self,
+        raw_capacity: int,
+        rollup_capacity: int,
+        rollup_resolution: float,
+        counter: bool = False,
+    ):
+        self.raw = RingBuffer(raw_capacity, 2)
+        self.rollup = RingBuffer(rollup_capacity, 4)
+        self.rollup_resolution = rollup_resolution
+        self.counter = counter
+        """是否为单调递增的计数器，决定跨降采样层查询时使用最大值还是平均值"""
+        self._bucket: list[float] | None = None
+        """正在聚合的桶：`[起始时间, 最后时间, 最小, 最大, 总和, 点数]`"""
+
+    @property
+    def nbytes(self) -> int:
+        return self.raw.nbytes + self.rollup.nbytes
+
+    def append(self, timestamp: float, value: float) -> None:
+        evicted = self.raw.append(timestamp, value)
+        if evicted is not None:
+            self._fold(*evicted)
+
+    def _fold(self, timestamp: float, value: float) -> None:
+        bucket = self._bucket
+        if bucket is not None and timestamp >= bucket[0] + self.rollup_resolution:
+            self.rollup.append(bucket[1], bucket[2], bucket[3], bucket[4] / bucket[5])
+            bucket = None
+        if bucket is None:
+            start = timestamp - timestamp % self.rollup_resolution
+            self._bucket = [start, timestamp, value, value, value, 1]
+            return
+        bucket[1] = timestamp
+        bucket[2] = min(bucket[2], value)
+        bucket[3] = max(bucket[3], value)
+        bucket[4] += value
+        bucket[5] += 1
+
+    def points(self, start: float, agg: str | None = None) -> list[tuple[float, float]]:
+        """
+        返回 `start` 之后的所有点
+
+        超出原始层的部分使用降采样后的 `agg`（`min`、`max` 或 `avg`），
+        默认计数器取最大值，其余取平均值。
+        """
+        agg = agg or ("max" if self.counter else "avg")
+        column = ROLLUP_COLUMNS[agg]
+        points = [
+            (row[0], row[column]) for row in self.rollup.rows() if row[0] >= start
+        ]
+        bucket = self._bucket
+        if bucket is not None and bucket[1] >= start:
+            value = bucket[4] / bucket[5] if agg == "avg" else bucket[column + 1]
+            points.append((bucket[1], value))
+        points.extend((t, v) for t, v in self.raw.rows() if t >= start)
+        return points
+
+
+class TimeSeriesStore:
+    """
+    进程内的近期指标历史
+
+    由后台任务按 `resolution` 定期写入配置的查询表达式结果，
+    原始点保留 `retention` 秒，之后每 `rollup_resolution` 秒降采样为一个点，
+    再保留 `rollup_retention` 秒。
+    序列数量不超过 `max_series`，超出的新序列会被丢弃。
+    """
+
+    def __init__(self):
+        self.expressions: tuple[str, ...] = ()
+        self.resolution = 15.0
+        self.retention = 3600.0
+        self.rollup_resolution = 300.0
+        self.rollup_retention = 604800.0
+        self.max_series = 100
+        self.dropped = 0
+        """因超出 `max_series` 而被丢弃的写入次数"""
+        self._series: dict[tuple, TimeSeries] = {}
+
+    def configure(
+        self,
+        expressions: Sequence[str],
+        resolution: float,
+        retention: float,
+        rollup_resolution: float,
+        rollup_retention: float,
+        max_series: int,
+    ) -> None:
+        """调整采样参数，存储布局发生变化时丢弃已有的历史"""
+        layout = (resolution, retention, rollup_resolution, rollup_retention)
+        if layout != (
+            self.resolution,
+            self.retention,
+            self.rollup_resolution,
+            self.rollup_retention,
+        ):
+            self._series.clear()
+        self.expressions = tuple(expressions)
+        self.resolution, self.retention = resolution, retention
+        self.rollup_resolution = rollup_resolution
+        self.rollup_retention = rollup_retention
+        self.max_series = max_series
+        for key in list(self._series)[max_series:]:
+            del self._series[key]
+
+    def __len__(self) -> int:
+        return len(self._series)
+
+    @property
+    def series_nbytes(self) -> int:
+        """单条序列占用的字节数"""
+        raw = math.ceil(self.retention / self.resolution)
+        rollup = math.ceil(self.rollup_retention / self.rollup_resolution)
+        return raw * 16 + rollup * 32
+
+    @property
+    def nbytes(self) -> int:
+        return sum(series.nbytes for series in self._series.values())
+
+    @staticmethod
+    def key(name: str, labels: dict[str, str]) -> tuple:
+        return (name, *sorted(labels.items()))
+
+    def get(self, name: str, labels: dict[str, str]) -> TimeSeries | None:
+        return self._series.get(self.key(name, labels))
+
+    def record(
+        self,
+        name: str,
+        labels: dict[str, str],
+        timestamp: float,
+        value: float,
+        counter: bool = False,
+    ) -> None:
+        key = self.key(name, labels)
+        series = self._series.get(key)
+        if series is None:
+            if len(self._series) >= self.max_series:
+                self.dropped += 1
+                return
+            series = self._series[key] = TimeSeries(
+                math.ceil(self.retention / self.resolution),
+                math.ceil(self.rollup_retention / self.rollup_resolution),
+                self.rollup_resolution,
+                counter,
+            )
+        series.append(timestamp, value)
+
+    def points(
+        self, name: str, labels: dict[str, str], start: float
+    ) -> Sequence[tuple[float, float]]:
+        series = self.get(name, labels)
+        return series.points(start) if series else []
+
+
+timeseries_store = keeping("timeseries_store", obj_factory=TimeSeriesStore)
+timeseries_series_gauge.set_function(lambda: len(timeseries_store))
+timeseries_memory_gauge.set_function(lambda: timeseries_store.nbytes)
+timeseries_dropped_gauge.set_function(lambda: timeseries_store.dropped)
@@ -1,13 +1,25 @@
+import asyncio
+
 from arclet.alconna import Alconna, CommandMeta
-from arclet.entari import metadata, command, Session, Image
+from arclet.entari import metadata, command, Session, Image, Plugin
+
+from miraita.log import logger
+from miraita.utils import assets, warm_host_facts
 
-from .drawer import draw
+from .drawer import draw_async as draw_async
+from .drawer import current_etag as current_etag
+from .drawer import get_encode_options as get_encode_options
+from .cache import render_cache as render_cache
+from .cache import StatusImage as StatusImage
+from .config import Config, config
+from .constant import default_theme
 
 metadata(
     name="服务器状态",
     author=["Komorebi <mute231010@gmail.com>"],
     description="查看服务器状态",
     classifier=["工具"],
+    config=Config,
 )
 
 status = Alconna(
@@ -20,6 +32,29 @@ status = Alconna(
 )
 
 
+plugin = Plugin.current()
+
+
+@plugin.use("::startup")
+async def on_startup():
+    await warm_host_facts()
+    theme = default_theme
+    try:
+        await asyncio.to_thread(
+            assets.preload,
+            fonts=[
+                (theme.nickname_font, 64),
+                (theme.value_font, 38),
+                (theme.details_font, 36),
+            ],
+            images=[theme.background, theme.marker],
+        )
+    except OSError as e:
+        logger.warning(f"Failed to preload status assets: {e}")
+
+
 @command.on(status)
 async def _(session: Session):
-    await session.send([Image.of(raw=draw(), mime="image/png")])
+    options = get_encode_options(session.account.platform)
+    image = await render_cache.get(options, draw_async, config.render_ttl)
+    await session.send([Image.of(raw=image.data, mime=image.mime)])
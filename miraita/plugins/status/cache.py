@@ -0,0 +1,82 @@
+import time
+import asyncio
+from dataclasses import dataclass
+from collections.abc import Awaitable, Callable
+
+from arclet.entari import keeping
+
+from miraita.utils import EncodeOptions
+
+from .metrics import status_render_cache_counter, status_render_histogram
+
+
+@dataclass
+class StatusImage:
+    """编码完成的状态图"""
+
+    data: bytes
+    mime: str
+    etag: str
+    sampled_at: float
+    """所用系统状态快照的采样时间"""
+    rendered_at: float
+
+    @property
+    def age(self) -> float:
+        return max(time.time() - self.rendered_at, 0)
+
+
+class RenderCache:
+    """
+    状态图缓存
+
+    按编码参数分别缓存。同一参数同一时间只有一次渲染在进行，
+    并发的请求等待并共用这次渲染的结果；渲染完成的图片在 `ttl` 秒内直接复用。
+    """
+
+    def __init__(self):
+        self._images: dict[EncodeOptions, StatusImage] = {}
+        self._pending: dict[EncodeOptions, asyncio.Task[StatusImage]] = {}
+
+    async def get(
+        self,
+        options: EncodeOptions,
+        render: Callable[[EncodeOptions], Awaitable[StatusImage]],
+        ttl: float,
+    ) -> StatusImage:
+        """
+        获取状态图
+
+        缓存缺失或超过 `ttl` 时调用 `render` 重新渲染，已有渲染在进行时等待其结果
+        """
+        image = self._images.get(options)
+        if image is not None and image.age < ttl:
+            status_render_cache_counter.labels("hit").inc()
+            return image
+        if pending := self._pending.get(options):
+            status_render_cache_counter.labels("shared").inc()
+            return await asyncio.shield(pending)
+
+        status_render_cache_counter.labels("miss").inc()
+        pending = self._pending[options] = asyncio.create_task(
+            self._render(options, render)
+        )
+        # 发起渲染的请求被取消时渲染仍继续进行，渲染结束后才移除，避免重复渲染
+        pending.add_done_callback(lambda _: self._pending.pop(options, None))
+        return await asyncio.shield(pending)
+
+    async def _render(
+        self,
+        options: EncodeOptions,
+        render: Callable[[EncodeOptions], Awaitable[StatusImage]],
+    ) -> StatusImage:
+        start = time.perf_counter()
+        image = self._images[options] = await render(options)
+        status_render_histogram.observe(time.perf_counter() - start)
+        return image
+
+    def invalidate(self) -> None:
+        self._images.clear()
+
+
+render_cache = keeping("status_render_cache", obj_factory=RenderCache)
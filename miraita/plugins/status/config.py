@@ -0,0 +1,26 @@
+from arclet.entari import BasicConfModel, plugin_config
+from arclet.entari.config import model_field
+
+from miraita.utils.image import ImageFormat
+
+
+class Config(BasicConfModel):
+    render_ttl: float = 5
+    """状态图的缓存时间（单位：秒），期间所有会话共用同一张图片，为 0 时不缓存"""
+    image_format: ImageFormat = "png"
+    """状态图的编码格式，可选 `png`、`palette`、`webp`、`webp_lossless`、`jpeg`"""
+    image_compress_level: int = 6
+    """PNG 的压缩等级，取值范围 [0, 9]"""
+    image_quality: int = 85
+    """有损 WebP 与 JPEG 的质量，取值范围 [0, 100]"""
+    image_webp_method: int = 4
+    """WebP 的编码速度，取值范围 [0, 6]，越小越快"""
+    image_colors: int = 256
+    """`palette` 格式的颜色数"""
+    image_max_width: int = 0
+    """状态图的最大宽度，超过时等比缩小，为 0 时不缩放"""
+    platform_max_width: dict[str, int] = model_field(default_factory=dict)
+    """按平台单独指定的最大宽度，覆盖 `image_max_width`"""
+
+
+config = plugin_config(Config)
@@ -3,6 +3,8 @@ from typing import Literal, TypeAlias
 
 from miraita.configs import FONT_DIR, IMAGE_DIR
 
+from .render import Theme
+
 Color: TypeAlias = Literal[
     "cpu", "ram", "swap", "disk", "nickname", "details", "transparent"
 ]
@@ -22,6 +24,21 @@ baotu_font_path: Path = FONT_DIR / "status" / "baotu.ttf"
 spicy_font_path: Path = FONT_DIR / "status" / "SpicyRice-Regular.ttf"
 adlam_font_path: Path = FONT_DIR / "status" / "ADLaMDisplay-Regular.ttf"
 
+default_theme = Theme(
+    background=bg_img_path,
+    marker=marker_img_path,
+    nickname_font=baotu_font_path,
+    value_font=spicy_font_path,
+    details_font=adlam_font_path,
+    cpu_color=cpu_color,
+    ram_color=ram_color,
+    swap_color=swap_color,
+    disk_color=disk_color,
+    details_color=details_color,
+    nickname_color=nickname_color,
+    transparent_color=transparent_color,
+)
+
 
 def get_color(color: Color) -> tuple[int, int, int, int]:
     return globals()[f"{color}_color"]
@@ -1,141 +1,118 @@
-import platform
-from io import BytesIO
-
-import cpuinfo
-
-from PIL import Image, ImageDraw, ImageFont
+import time
+import asyncio
+import hashlib
+from datetime import timedelta
 
 from arclet.entari.plugin import get_plugins
-from arclet.entari import __version__ as __entari_version__
 
-from miraita import __version__ as __miraita_version__
-from miraita.plugins.prometheus import get_system_metrics
+from miraita.utils import (
+    EncodeOptions,
+    EncodedImage,
+    assets,
+    encode_image,
+    get_host_facts,
+)
+from miraita.plugins.prometheus import (
+    StatusSnapshot,
+    get_system_metrics,
+    system_sampler,
+)
 
+from .config import config
+from .cache import StatusImage
 from .model import get_status_info
 from .utils import truncate_string
-from .constant import (
-    cpu_color,
-    ram_color,
-    disk_color,
-    swap_color,
-    details_color,
-    nickname_color,
-    transparent_color,
-    bg_img_path,
-    adlam_font_path,
-    baotu_font_path,
-    marker_img_path,
-    spicy_font_path,
-)
+from .constant import default_theme
+from .render import Gauge, StaticInfo, DynamicInfo, StatusRenderer
 
 
 nickname = "Miraita"
-system = platform.uname()
 
-adlam_fnt = ImageFont.truetype(str(adlam_font_path), 36)
-spicy_fnt = ImageFont.truetype(str(spicy_font_path), 38)
-baotu_fnt = ImageFont.truetype(str(baotu_font_path), 64)
+renderer = StatusRenderer(default_theme, load_font=assets.font, load_image=assets.image)
 
 
-def draw() -> bytes:
+def get_static_info() -> StaticInfo:
     loaded_plugins = [
         plugin
         for plugin in get_plugins()
         if plugin.id.startswith(("miraita.plugins.", "arclet.entari.builtins."))
     ]
-
-    with Image.open(bg_img_path).convert("RGBA") as base:
-        img = Image.new("RGBA", base.size, (0, 0, 0, 0))
-        marker = Image.open(marker_img_path)
-
-        cpu, ram, swap, disk = get_status_info()
-
-        cpu_info = f"{cpu.usage}% - {cpu.freq}Ghz [{cpu.core} core]"
-        ram_info = f"{ram.usage} / {ram.total} GB"
-        swap_info = f"{swap.usage} / {swap.total} GB"
-        disk_info = f"{disk.usage} / {disk.total} GB"
-
-        content = ImageDraw.Draw(img)
-        content.text((103, 581), nickname, font=baotu_fnt, fill=nickname_color)
-        content.text((251, 772), cpu_info, font=spicy_fnt, fill=cpu_color)
-        content.text((251, 927), ram_info, font=spicy_fnt, fill=ram_color)
-        content.text((251, 1081), swap_info, font=spicy_fnt, fill=swap_color)
-        content.text((251, 1235), disk_info, font=spicy_fnt, fill=disk_color)
-
-        content.arc(
-            (103, 724, 217, 838),
-            start=-90,
-            end=(cpu.usage * 3.6 - 90),
-            width=115,
-            fill=cpu_color,
-        )
-        content.arc(
-            (103, 878, 217, 992),
-            start=-90,
-            end=(ram.usage / ram.total * 360 - 90),
-            width=115,
-            fill=ram_color,
-        )
-        if swap.total > 0:
-            content.arc(
-                (103, 1032, 217, 1146),
-                start=-90,
-                end=(swap.usage / swap.total * 360 - 90),
-                width=115,
-                fill=swap_color,
-            )
-        content.arc(
-            (103, 1186, 217, 1300),
-            start=-90,
-            end=(disk.usage / disk.total * 360 - 90),
-            width=115,
-            fill=disk_color,
-        )
-
-        content.ellipse((108, 729, 212, 833), width=105, fill=transparent_color)
-        content.ellipse((108, 883, 212, 987), width=105, fill=transparent_color)
-        content.ellipse((108, 1037, 212, 1141), width=105, fill=transparent_color)
-        content.ellipse((108, 1192, 212, 1295), width=105, fill=transparent_color)
-
-        content.text(
-            (352, 1378),
-            f"{truncate_string(cpuinfo.get_cpu_info()['brand_raw'])}",
-            font=adlam_fnt,
-            fill=details_color,
-        )
-        content.text(
-            (352, 1431),
-            f"{truncate_string(system.system + ' ' + system.release)}",
-            font=adlam_fnt,
-            fill=details_color,
-        )
-        content.text(
-            (352, 1484),
-            f"Entari {__entari_version__} x Miraita {__miraita_version__}",
-            font=adlam_fnt,
-            fill=details_color,
-        )
-        content.text(
-            (352, 1537),
-            f"{len(loaded_plugins)} loaded",
-            font=adlam_fnt,
-            fill=details_color,
-        )
-        content.text(
-            (957, 1703),
-            f"Runtime {get_system_metrics().uptime}",
-            font=adlam_fnt,
-            fill=details_color,
-            anchor="ra",
-        )
-
-        nickname_length = baotu_fnt.getlength(nickname)
-        img.paste(marker, (103 + int(nickname_length) + 44, 595), marker)
-
-        out = Image.alpha_composite(base, img)
-
-        byte_io = BytesIO()
-        out.save(byte_io, format="png")
-        img_bytes = byte_io.getvalue()
-
-        return img_bytes
+    host = get_host_facts()
+    return StaticInfo(
+        nickname=nickname,
+        cpu_brand=truncate_string(host.cpu_brand),
+        system=truncate_string(host.system + " " + host.release),
+        version=f"Entari {host.entari_version} x Miraita {host.miraita_version}",
+        plugins=len(loaded_plugins),
+    )
+
+
+def get_runtime(snapshot: StatusSnapshot) -> str:
+    """截至采样时刻的运行时间，使同一份采样渲染出的状态图完全一致"""
+    metrics = get_system_metrics()
+    if not metrics.start_timestamp:
+        return metrics.uptime
+    uptime = snapshot.timestamp - metrics.start_timestamp
+    return str(timedelta(seconds=int(max(uptime, 0))))
+
+
+def get_dynamic_info(snapshot: StatusSnapshot) -> DynamicInfo:
+    cpu, ram, swap, disk = get_status_info(snapshot)
+    return DynamicInfo(
+        cpu=Gauge(cpu.usage / 100, f"{cpu.usage}% - {cpu.freq}Ghz [{cpu.core} core]"),
+        ram=Gauge(ram.usage / ram.total, f"{ram.usage} / {ram.total} GB"),
+        swap=Gauge(
+            swap.usage / swap.total if swap.total > 0 else None,
+            f"{swap.usage} / {swap.total} GB",
+        ),
+        disk=Gauge(
+            disk.usage / disk.total if disk.total > 0 else None,
+            f"{disk.usage} / {disk.total} GB",
+        ),
+        runtime=get_runtime(snapshot),
+    )
+
+
+def get_encode_options(platform: str) -> EncodeOptions:
+    """按配置生成 `platform` 平台使用的编码参数"""
+    return EncodeOptions(
+        format=config.image_format,
+        compress_level=config.image_compress_level,
+        quality=config.image_quality,
+        method=config.image_webp_method,
+        colors=config.image_colors,
+        max_width=config.platform_max_width.get(platform, config.image_max_width),
+    )
+
+
+def draw(
+    static: StaticInfo, dynamic: DynamicInfo, options: EncodeOptions
+) -> EncodedImage:
+    return encode_image(renderer.render(static, dynamic), options)
+
+
+def get_etag(
+    static: StaticInfo, snapshot: StatusSnapshot, options: EncodeOptions
+) -> str:
+    """状态图由静态信息、系统状态快照与编码参数唯一确定，以三者的摘要作为 ETag"""
+    key = repr((static, snapshot.timestamp, options)).encode()
+    return hashlib.blake2b(key, digest_size=16).hexdigest()
+
+
+def current_etag(options: EncodeOptions) -> tuple[str, float]:
+    """当前状态下渲染出的状态图的 ETag 与采样时间，无需渲染"""
+    snapshot = system_sampler.latest()
+    return get_etag(get_static_info(), snapshot, options), snapshot.timestamp
+
+
+async def draw_async(options: EncodeOptions) -> StatusImage:
+    """在事件循环中收集信息，在工作线程中渲染与编码"""
+    static, snapshot = get_static_info(), system_sampler.latest()
+    encoded = await asyncio.to_thread(draw, static, get_dynamic_info(snapshot), options)
+    return StatusImage(
+        data=encoded.data,
+        mime=encoded.mime,
+        etag=get_etag(static, snapshot, options),
+        sampled_at=snapshot.timestamp,
+        rendered_at=time.time(),
+    )
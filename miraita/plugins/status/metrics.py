@@ -0,0 +1,58 @@
+from arclet.entari import keeping
+from prometheus_client import REGISTRY
+
+from miraita.utils import assets
+from miraita.plugins.prometheus import Counter, Gauge, Histogram  # entari: plugin
+
+status_render_cache_counter = keeping(
+    "status_render_cache_counter",
+    obj_factory=lambda: Counter(
+        "miraita_status_render_cache",
+        "Total number of status image requests by cache result (hit/shared/miss)",
+        ["result"],
+    ),
+    dispose=lambda counter: REGISTRY.unregister(counter),
+)
+
+status_render_histogram = keeping(
+    "status_render_histogram",
+    obj_factory=lambda: Histogram(
+        "miraita_status_render_seconds",
+        "Histogram of status image render and encode time",
+        buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+    ),
+    dispose=lambda histogram: REGISTRY.unregister(histogram),
+)
+
+assets_cached_gauge = keeping(
+    "assets_cached_gauge",
+    obj_factory=lambda: Gauge(
+        "miraita_assets_cached",
+        "Number of fonts and images held by the shared asset cache",
+        ["kind"],
+    ),
+    dispose=lambda gauge: REGISTRY.unregister(gauge),
+)
+
+assets_image_bytes_gauge = keeping(
+    "assets_image_bytes_gauge",
+    obj_factory=lambda: Gauge(
+        "miraita_assets_image_bytes",
+        "Decoded size of the images held by the shared asset cache in bytes",
+    ),
+    dispose=lambda gauge: REGISTRY.unregister(gauge),
+)
+
+assets_hit_rate_gauge = keeping(
+    "assets_hit_rate_gauge",
+    obj_factory=lambda: Gauge(
+        "miraita_assets_cache_hit_rate",
+        "Hit rate of the shared asset cache since startup",
+    ),
+    dispose=lambda gauge: REGISTRY.unregister(gauge),
+)
+
+assets_cached_gauge.labels("font").set_function(lambda: assets.stats.fonts)
+assets_cached_gauge.labels("image").set_function(lambda: assets.stats.images)
+assets_image_bytes_gauge.set_function(lambda: assets.stats.image_bytes)
+assets_hit_rate_gauge.set_function(lambda: assets.stats.hit_rate)
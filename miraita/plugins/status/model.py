@@ -1,7 +1,10 @@
 from dataclasses import dataclass
 
-import psutil
-import cpuinfo
+from miraita.plugins.prometheus import StatusSnapshot
+
+
+def to_gb(value: int) -> float:
+    return round(value / (1024**3), 2)
 
 
 @dataclass
@@ -14,15 +17,11 @@ class CPUInfo:
     """CPU 的时钟速度（单位：GHz）"""
 
     @classmethod
-    def get_cpu_info(cls):
-        cpu_core = psutil.cpu_count(logical=False)
-        cpu_usage = psutil.cpu_percent(interval=1)
-        cpu_freq = round(psutil.cpu_freq().current / 1000, 2)
-
-        if cpu_core is None:
-            cpu_core = cpuinfo.get_cpu_info()["count"]
-
-        return CPUInfo(core=cpu_core, usage=cpu_usage, freq=cpu_freq)
+    def from_snapshot(cls, snapshot: StatusSnapshot):
+        cpu = snapshot.cpu
+        return CPUInfo(
+            core=cpu.physical_cores, usage=cpu.usage, freq=round(cpu.freq / 1000, 2)
+        )
 
 
 @dataclass
@@ -35,11 +34,9 @@ class RAMInfo:
     """当前 RAM 占用量/GB"""
 
     @classmethod
-    def get_ram_info(cls):
-        ram_total = round(psutil.virtual_memory().total / (1024**3), 2)
-        ram_usage = round(psutil.virtual_memory().used / (1024**3), 2)
-
-        return RAMInfo(total=ram_total, usage=ram_usage)
+    def from_snapshot(cls, snapshot: StatusSnapshot):
+        memory = snapshot.memory
+        return RAMInfo(total=to_gb(memory.total), usage=to_gb(memory.used))
 
 
 @dataclass
@@ -52,11 +49,9 @@ class SwapMemory:
     """当前 Swap 占用量/GB"""
 
     @classmethod
-    def get_swap_info(cls):
-        swap_total = round(psutil.swap_memory().total / (1024**3), 2)
-        swap_usage = round(psutil.swap_memory().used / (1024**3), 2)
-
-        return SwapMemory(total=swap_total, usage=swap_usage)
+    def from_snapshot(cls, snapshot: StatusSnapshot):
+        swap = snapshot.swap
+        return SwapMemory(total=to_gb(swap.total), usage=to_gb(swap.used))
 
 
 @dataclass
@@ -69,18 +64,21 @@ class DiskInfo:
     """当前硬盘占用量/GB"""
 
     @classmethod
-    def get_disk_info(cls):
-        disk_total = round(psutil.disk_usage("/").total / (1024**3), 2)
-        disk_usage = round(psutil.disk_usage("/").used / (1024**3), 2)
-
-        return DiskInfo(total=disk_total, usage=disk_usage)
-
-
-def get_status_info() -> tuple[CPUInfo, RAMInfo, SwapMemory, DiskInfo]:
-    """获取 `CPU` `RAM` `SWAP` `DISK` 信息"""
-    cpu_info = CPUInfo.get_cpu_info()
-    ram_info = RAMInfo.get_ram_info()
-    swap_info = SwapMemory.get_swap_info()
-    disk_info = DiskInfo.get_disk_info()
+    def from_snapshot(cls, snapshot: StatusSnapshot):
+        """取第一个挂载点的用量"""
+        if not snapshot.disks:
+            return DiskInfo(total=0, usage=0)
+        disk = snapshot.disks[0]
+        return DiskInfo(total=to_gb(disk.total), usage=to_gb(disk.used))
+
+
+def get_status_info(
+    snapshot: StatusSnapshot,
+) -> tuple[CPUInfo, RAMInfo, SwapMemory, DiskInfo]:
+    """从系统状态快照中提取 `CPU` `RAM` `SWAP` `DISK` 信息"""
+    cpu_info = CPUInfo.from_snapshot(snapshot)
+    ram_info = RAMInfo.from_snapshot(snapshot)
+    swap_info = SwapMemory.from_snapshot(snapshot)
+    disk_info = DiskInfo.from_snapshot(snapshot)
 
     return cpu_info, ram_info, swap_info, disk_info
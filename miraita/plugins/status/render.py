@@ -0,0 +1,249 @@
+"""
+状态图的分层渲染
+
+背景、昵称、徽章、CPU 型号、系统版本、版本号与插件数量等很少变化的内容组成静态层，
+只在其输入变化时重新合成；每次请求只在静态层的副本上绘制圆环与数值。
+
+本模块只依赖 Pillow，可以脱离 Entari 单独加载（见 `benchmarks/`）。
+"""
+
+from pathlib import Path
+from functools import cache
+from threading import Lock
+from dataclasses import dataclass
+from collections.abc import Callable
+
+from PIL import Image, ImageDraw, ImageFont
+
+RGBA = tuple[int, int, int, int]
+
+
+@dataclass(frozen=True)
+class Theme:
+    """状态图使用的素材与配色"""
+
+    background: Path
+    marker: Path
+    nickname_font: Path
+    value_font: Path
+    details_font: Path
+    cpu_color: RGBA
+    ram_color: RGBA
+    swap_color: RGBA
+    disk_color: RGBA
+    details_color: RGBA
+    nickname_color: RGBA
+    transparent_color: RGBA = (0, 0, 0, 0)
+
+
+@dataclass(frozen=True)
+class StaticInfo:
+    """静态层的输入，任意字段变化都会触发静态层重建"""
+
+    nickname: str
+    cpu_brand: str
+    system: str
+    version: str
+    plugins: int
+
+
+@dataclass(frozen=True)
+class Gauge:
+    """一个圆环及其右侧的数值"""
+
+    usage: float | None
+    """占用比例，取值范围 [0, 1]，为 `None` 时不绘制圆环（如没有 Swap）"""
+    text: str
+
+
+@dataclass(frozen=True)
+class DynamicInfo:
+    """每次渲染都会变化的内容"""
+
+    cpu: Gauge
+    ram: Gauge
+    swap: Gauge
+    disk: Gauge
+    runtime: str
+
+
+GAUGE_LAYOUT = {
+    # 名称: (圆环外框, 镂空椭圆, 数值位置)
+    "cpu": ((103, 724, 217, 838), (108, 729, 212, 833), (251, 772)),
+    "ram": ((103, 878, 217, 992), (108, 883, 212, 987), (251, 927)),
+    "swap": ((103, 1032, 217, 1146), (108, 1037, 212, 1141), (251, 1081)),
+    "disk": ((103, 1186, 217, 1300), (108, 1192, 212, 1295), (251, 1235)),
+}
+NICKNAME_POS = (103, 581)
+MARKER_Y = 595
+DETAILS_X = 352
+DETAILS_Y = (1378, 1431, 1484, 1537)
+RUNTIME_POS = (957, 1703)
+
+
+@cache
+def _load_font(path: Path, size: int) -> ImageFont.FreeTypeFont:
+    return ImageFont.truetype(str(path), size)
+
+
+def _load_image(path: Path) -> Image.Image:
+    with Image.open(path) as image:
+        return image.convert("RGBA")
+
+
+class StatusRenderer:
+    """
+    状态图渲染器
+
+    字体与图片通过 `load_font` 与 `load_image` 加载，默认字体按路径与字号缓存、
+    图片每次从磁盘读取，可以传入共享的加载函数（如 `miraita.utils.assets`）。
+    静态层按 `StaticInfo` 与所用素材文件的修改时间缓存，素材被替换后会重新合成。
+    可以在工作线程中调用，同一时间只有一个线程在渲染。
+    """
+
+    def __init__(
+        self,
+        theme: Theme,
+        load_font: Callable[[Path, int], ImageFont.FreeTypeFont] | None = None,
+        load_image: Callable[[Path], Image.Image] | None = None,
+    ):
+        self.theme = theme
+        self.load_font = load_font or _load_font
+        self.load_image = load_image or _load_image
+        self._static: tuple[tuple, Image.Image] | None = None
+        """`((StaticInfo, 素材修改时间), 静态层)`"""
+        self._lock = Lock()
+
+    def font(self, path: Path, size: int) -> ImageFont.FreeTypeFont:
+        return self.load_font(path, size)
+
+    @property
+    def nickname_font(self) -> ImageFont.FreeTypeFont:
+        return self.font(self.theme.nickname_font, 64)
+
+    @property
+    def value_font(self) -> ImageFont.FreeTypeFont:
+        return self.font(self.theme.value_font, 38)
+
+    @property
+    def details_font(self) -> ImageFont.FreeTypeFont:
+        return self.font(self.theme.details_font, 36)
+
+    def invalidate(self) -> None:
+        """丢弃已缓存的静态层"""
+        self._static = None
+
+    def _static_assets(self) -> tuple[int, ...]:
+        theme = self.theme
+        paths = (
+            theme.background,
+            theme.marker,
+            theme.nickname_font,
+            theme.details_font,
+        )
+        return tuple(Path(path).stat().st_mtime_ns for path in paths)
+
+    def static_layer(self, info: StaticInfo) -> Image.Image:
+        """获取静态层，`info` 或素材文件与上次不同时重新合成"""
+        key = (info, self._static_assets())
+        if self._static is not None and self._static[0] == key:
+            return self._static[1]
+
+        theme = self.theme
+        base = self.load_image(theme.background)
+        layer = Image.new("RGBA", base.size, (0, 0, 0, 0))
+        content = ImageDraw.Draw(layer)
+        content.text(
+            NICKNAME_POS,
+            info.nickname,
+            font=self.nickname_font,
+            fill=theme.nickname_color,
+        )
+        details = (info.cpu_brand, info.system, info.version, f"{info.plugins} loaded")
+        for y, text in zip(DETAILS_Y, details):
+            content.text(
+                (DETAILS_X, y), text, font=self.details_font, fill=theme.details_color
+            )
+
+        marker = self.load_image(theme.marker)
+        nickname_length = self.nickname_font.getlength(info.nickname)
+        x = NICKNAME_POS[0] + int(nickname_length) + 44
+        layer.paste(marker, (x, MARKER_Y), marker)
+
+        static = Image.alpha_composite(base, layer)
+        self._static = (key, static)
+        return static
+
+    def render(self, static: StaticInfo, dynamic: DynamicInfo) -> Image.Image:
+        """在静态层的副本上绘制圆环与数值"""
+        with self._lock:
+            return self._render(static, dynamic)
+
+    def _render(self, static: StaticInfo, dynamic: DynamicInfo) -> Image.Image:
+        theme = self.theme
+        canvas = self.static_layer(static).copy()
+        gauges = {
+            "cpu": (dynamic.cpu, theme.cpu_color),
+            "ram": (dynamic.ram, theme.ram_color),
+            "swap": (dynamic.swap, theme.swap_color),
+            "disk": (dynamic.disk, theme.disk_color),
+        }
+        for name, (gauge, color) in gauges.items():
+            ring, hole, text_pos = GAUGE_LAYOUT[name]
+            if gauge.usage is not None:
+                self._ring(canvas, ring, hole, gauge.usage, color)
+            self._text(canvas, text_pos, gauge.text, color)
+
+        self._text(
+            canvas,
+            RUNTIME_POS,
+            f"Runtime {dynamic.runtime}",
+            theme.details_color,
+            font=self.details_font,
+            anchor="ra",
+        )
+        return canvas
+
+    def _ring(
+        self,
+        canvas: Image.Image,
+        ring: tuple[int, int, int, int],
+        hole: tuple[int, int, int, int],
+        usage: float,
+        color: RGBA,
+    ) -> None:
+        x0, y0, x1, y1 = ring
+        tile = Image.new("RGBA", (x1 - x0 + 1, y1 - y0 + 1), (0, 0, 0, 0))
+        content = ImageDraw.Draw(tile)
+        content.arc(
+            (0, 0, x1 - x0, y1 - y0),
+            start=-90,
+            end=usage * 360 - 90,
+            width=115,
+            fill=color,
+        )
+        content.ellipse(
+            (hole[0] - x0, hole[1] - y0, hole[2] - x0, hole[3] - y0),
+            width=105,
+            fill=self.theme.transparent_color,
+        )
+        canvas.alpha_composite(tile, (x0, y0))
+
+    def _text(
+        self,
+        canvas: Image.Image,
+        xy: tuple[int, int],
+        text: str,
+        color: RGBA,
+        font: ImageFont.FreeTypeFont | None = None,
+        anchor: str | None = None,
+    ) -> None:
+        font = font or self.value_font
+        left, top, right, bottom = font.getbbox(text, anchor=anchor)
+        left, top = max(int(xy[0] + left), 0), max(int(xy[1] + top), 0)
+        right, bottom = xy[0] + right, xy[1] + bottom
+        tile = Image.new("RGBA", (int(right) - left + 1, int(bottom) - top + 1))
+        ImageDraw.Draw(tile).text(
+            (xy[0] - left, xy[1] - top), text, font=font, fill=color, anchor=anchor
+        )
+        canvas.alpha_composite(tile, (left, top))
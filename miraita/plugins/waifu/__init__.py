@@ -1,10 +1,24 @@
 import random
 
 from arclet.alconna import Alconna, CommandMeta
-from arclet.entari import metadata, command, Session, At, Image, MessageChain
+from arclet.entari import (
+    metadata,
+    command,
+    Session,
+    At,
+    Image,
+    MessageChain,
+    Plugin,
+)
+from arclet.entari.event.base import (
+    GuildMemberAddedEvent,
+    GuildMemberRemovedEvent,
+    GuildMemberUpdatedEvent,
+)
 
 from .config import Config, config
-from .data_source import get_waifu_data, save_waifu_data
+from .data_source import get_waifu_data, save_waifu_data, waifu_store
+from .members import GuildKey, member_cache
 
 metadata(
     name="娶群友",
@@ -24,6 +38,33 @@ waifu_alc = Alconna(
 )
 waifu_disp = command.mount(waifu_alc)
 
+plugin = Plugin.current()
+plugin.collect(waifu_store.flush_sync)
+
+
+@plugin.use("::cleanup")
+async def on_cleanup():
+    await waifu_store.flush()
+
+
+def guild_key(session: Session) -> GuildKey:
+    return (session.account.platform, session.account.self_id, session.guild.id)
+
+
+@plugin.dispatch(GuildMemberAddedEvent)
+async def on_member_added(session: Session):
+    member_cache.update(guild_key(session), session.user)
+
+
+@plugin.dispatch(GuildMemberUpdatedEvent)
+async def on_member_updated(session: Session):
+    member_cache.update(guild_key(session), session.user)
+
+
+@plugin.dispatch(GuildMemberRemovedEvent)
+async def on_member_removed(session: Session):
+    member_cache.remove(guild_key(session), session.user.id)
+
 
 @waifu_disp.handle()
 async def _(session: Session):
@@ -35,28 +76,20 @@ async def _(session: Session):
         await session.send("已经有老婆了，不能花心")
         return
 
-    members = (await session.guild_member_list()).data
-
-    member = random.choice(members)
-
-    if member.user is None or member.user.avatar is None:
-        return
+    pool = await member_cache.get(guild_key(session), session.guild_member_list)
+    user = pool.pick(exclude=session.user.id)
 
-    if (
-        random.random() < config.no_waifu_prob
-        or member.user.is_bot
-        or member.user.id == session.user.id
-    ):
+    if user is None or random.random() < config.no_waifu_prob:
         return random.choice(config.no_waifu_text)
 
     msg = MessageChain(
         [
-            Image(src=member.user.avatar),
+            Image(src=user.avatar),  # type: ignore
             "你今天的群老婆是",
-            At(member.user.id, name=member.user.name),
+            At(user.id, name=user.name),
         ]
     )
 
-    await save_waifu_data(session.user.id, member.user.id)
+    await save_waifu_data(session.user.id, user.id)
 
     await session.send(msg)
@@ -7,6 +7,12 @@ class Config(BasicConfModel):
     no_waifu_text: list[str] = model_field(
         default_factory=lambda: ["你没有娶到群友，强者注定孤独，加油！找不到对象.jpg"]
     )
+    member_cache_ttl: float = 600
+    """群成员列表的缓存时间（单位：秒）"""
+    member_cache_size: int = 256
+    """最多缓存成员列表的群组数量"""
+    flush_delay: float = 1
+    """新记录写入磁盘前的合并等待时间（单位：秒）"""
 
 
 config = plugin_config(Config)
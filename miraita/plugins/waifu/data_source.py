@@ -1,7 +1,18 @@
+import os
 import json
+import asyncio
+import threading
+from pathlib import Path
 from dataclasses import dataclass, asdict
 
-from arclet.entari import local_data
+from arclet.entari import local_data, keeping
+
+from miraita.log import logger
+
+from .config import config
+
+COMPACT_MIN_LINES = 1000
+"""日志行数超过该值且超过索引条数的两倍时压缩日志"""
 
 
 @dataclass
@@ -10,32 +21,162 @@ class WaifuJsonData:
     waifu_id: str
 
 
-async def get_waifu_data(user_id: str) -> WaifuJsonData | None:
-    file = local_data.get_data_file("waifu", "data.json")
+def _write_atomic(file: Path, content: str) -> None:
+    """写入临时文件后替换，避免中途失败留下不完整的文件"""
+    tmp = file.with_name(file.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, file)
 
-    try:
-        with open(file, encoding="utf-8") as f:
-            data = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return None
 
-    if user_id not in data:
-        return None
+class WaifuStore:
+    """
+    娶群友记录的存储
 
-    user_data = data[user_id]
-    return WaifuJsonData(**user_data)
+    所有记录在首次使用时载入内存索引，查询不再读取文件。
+    写入先更新索引，再由后台任务每隔 `flush_delay` 秒将新记录批量追加到
+    `journal.jsonl`；同一用户在一批中的多次写入只保留最后一次。
+    日志中重复的记录过多时整体重写一次，重写通过临时文件原子替换。
+    追加与重写由同一把线程锁串行，重写时读取最新的索引，
+    因此插件卸载时同步写入的记录不会被工作线程中的重写覆盖。
 
+    首次载入时若只有旧版的 `data.json`，会将其迁移到日志并重命名为 `data.json.bak`。
+    """
 
-async def save_waifu_data(user_id: str, waifu_id: str) -> None:
-    file = local_data.get_data_file("waifu", "data.json")
+    def __init__(self):
+        self._index: dict[str, WaifuJsonData] | None = None
+        self._pending: dict[str, WaifuJsonData] = {}
+        self._lines = 0
+        """日志中的记录行数，用于判断是否需要压缩"""
+        self._load_lock = asyncio.Lock()
+        self._flush_lock = asyncio.Lock()
+        self._file_lock = threading.Lock()
+        """串行工作线程与同步写入对日志文件的修改"""
+        self._flush_task: asyncio.Task | None = None
+
+    @property
+    def journal(self) -> Path:
+        return local_data.get_data_file("waifu", "journal.jsonl")
+
+    @property
+    def legacy(self) -> Path:
+        return local_data.get_data_file("waifu", "data.json")
+
+    def _load(self) -> dict[str, WaifuJsonData]:
+        index: dict[str, WaifuJsonData] = {}
+        journal, legacy = self.journal, self.legacy
+        if journal.exists():
+            with open(journal, "rb+") as f:
+                end = 0
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        # 进程中断时最后一行可能不完整，截去以免与之后追加的记录相连
+                        f.truncate(end)
+                        break
+                    end += len(line)
+                    try:
+                        record = WaifuJsonData(**json.loads(line))
+                    except (json.JSONDecodeError, TypeError):
+                        continue
+                    index[record.user_id] = record
+                    self._lines += 1
+        elif legacy.exists():
+            try:
+                with open(legacy, encoding="utf-8") as f:
+                    data = json.load(f)
+            except json.JSONDecodeError:
+                data = {}
+            index = {user_id: WaifuJsonData(**item) for user_id, item in data.items()}
+            self._rewrite(index)
+            legacy.rename(legacy.with_name(legacy.name + ".bak"))
+            logger.info(f"Migrated {len(index)} waifu records from {legacy}")
+        return index
+
+    def _rewrite(self, index: dict[str, WaifuJsonData] | None = None) -> None:
+        """用 `index`（默认为加锁后的当前索引）重写日志"""
+        with self._file_lock:
+            # 在锁内读取索引，包含等待期间其他写入者追加的记录
+            index = dict(self._index if index is None else index)  # type: ignore
+            _write_atomic(
+                self.journal,
+                "".join(
+                    json.dumps(asdict(record), ensure_ascii=False) + "\n"
+                    for record in index.values()
+                ),
+            )
+            self._lines = len(index)
+
+    def _append(self, records: list[WaifuJsonData]) -> None:
+        with self._file_lock:
+            with open(self.journal, "a", encoding="utf-8") as f:
+                f.write(
+                    "".join(
+                        json.dumps(asdict(record), ensure_ascii=False) + "\n"
+                        for record in records
+                    )
+                )
+                f.flush()
+                os.fsync(f.fileno())
+            self._lines += len(records)
+
+    async def index(self) -> dict[str, WaifuJsonData]:
+        if self._index is None:
+            async with self._load_lock:
+                if self._index is None:
+                    self._index = await asyncio.to_thread(self._load)
+        return self._index
 
-    try:
-        with open(file) as f:
-            data = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        data = {}
+    async def get(self, user_id: str) -> WaifuJsonData | None:
+        return (await self.index()).get(user_id)
 
-    data[user_id] = asdict(WaifuJsonData(user_id=user_id, waifu_id=waifu_id))
+    async def save(self, user_id: str, waifu_id: str) -> None:
+        record = WaifuJsonData(user_id=user_id, waifu_id=waifu_id)
+        (await self.index())[user_id] = record
+        self._pending[user_id] = record
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._delayed_flush())
 
-    with open(file, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    async def _delayed_flush(self) -> None:
+        await asyncio.sleep(config.flush_delay)
+        try:
+            await self.flush()
+        except OSError as e:
+            # 后台任务无人等待，记录错误后重新安排写入，而不是向上抛出
+            logger.warning(f"Failed to flush waifu records, will retry: {e}")
+            self._flush_task = asyncio.create_task(self._delayed_flush())
+
+    async def flush(self) -> None:
+        """将尚未写入的记录追加到日志"""
+        async with self._flush_lock:
+            if not self._pending or self._index is None:
+                return
+            records = list(self._pending.values())
+            self._pending = {}
+            try:
+                await asyncio.to_thread(self._append, records)
+            except OSError:
+                # 写入失败时放回，等待下一次写入重试
+                self._pending = {r.user_id: r for r in records} | self._pending
+                raise
+            if self._lines > max(COMPACT_MIN_LINES, 2 * len(self._index)):
+                await asyncio.to_thread(self._rewrite)
+
+    def flush_sync(self) -> None:
+        """在事件循环之外（如插件卸载时）同步写入剩余的记录"""
+        if self._pending and self._index is not None:
+            records = list(self._pending.values())
+            self._pending = {}
+            self._append(records)
+
+
+waifu_store = keeping("waifu_store", obj_factory=WaifuStore)
+
+
+async def get_waifu_data(user_id: str) -> WaifuJsonData | None:
+    return await waifu_store.get(user_id)
+
+
+async def save_waifu_data(user_id: str, waifu_id: str) -> None:
+    await waifu_store.save(user_id, waifu_id)
@@ -0,0 +1,157 @@
+import time
+import random
+import asyncio
+from dataclasses import replace
+from collections import OrderedDict
+from collections.abc import AsyncIterable, Callable
+
+from arclet.entari import keeping
+from satori.model import Member, User
+
+from .config import config
+from .metrics import member_cache_counter, member_fetch_histogram
+
+GuildKey = tuple[str, str, str]
+"""`(平台, 机器人 ID, 群组 ID)`"""
+
+
+def eligible(user: User | None) -> bool:
+    """能被抽中的群友：有头像且不是机器人"""
+    return user is not None and bool(user.avatar) and not user.is_bot
+
+
+class CandidatePool:
+    """
+    一个群组中可被抽中的群友
+
+    列表与位置索引配合，增删（交换到末尾后删除）与随机抽取都是 O(1)。
+    """
+
+    def __init__(self, users: list[User]):
+        self.fetched_at = time.time()
+        self._users: list[User] = []
+        self._positions: dict[str, int] = {}
+        for user in users:
+            self.add(user)
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    @property
+    def age(self) -> float:
+        return max(time.time() - self.fetched_at, 0)
+
+    def add(self, user: User) -> None:
+        if not eligible(user):
+            self.remove(user.id)
+            return
+        if (index := self._positions.get(user.id)) is not None:
+            self._users[index] = user
+            return
+        self._positions[user.id] = len(self._users)
+        self._users.append(user)
+
+    def update(self, user: User) -> None:
+        """
+        按事件更新群友资料
+
+        事件中的资料可能不完整，缺失的字段沿用已有的资料，
+        只有明确标记为机器人时才将其移除。
+        """
+        if user.is_bot:
+            self.remove(user.id)
+            return
+        if (index := self._positions.get(user.id)) is None:
+            if eligible(user):
+                self.add(user)
+            return
+        changes = {
+            name: value
+            for name in ("name", "nick", "avatar")
+            if (value := getattr(user, name)) is not None
+        }
+        self._users[index] = replace(self._users[index], **changes)
+
+    def remove(self, user_id: str) -> None:
+        index = self._positions.pop(user_id, None)
+        if index is None:
+            return
+        last = self._users.pop()
+        if index < len(self._users):
+            self._users[index] = last
+            self._positions[last.id] = index
+
+    def pick(self, exclude: str | None = None) -> User | None:
+        """等概率抽取一名群友，不会抽到 `exclude`"""
+        excluded = self._positions.get(exclude) if exclude is not None else None
+        size = len(self._users) - (excluded is not None)
+        if size <= 0:
+            return None
+        index = random.randrange(size)
+        if excluded is not None and index >= excluded:
+            index += 1
+        return self._users[index]
+
+
+class MemberCache:
+    """
+    群成员缓存
+
+    首次使用时按分页拉取完整的成员列表，只保留可被抽中的群友；
+    缓存在 `member_cache_ttl` 秒后过期，期间由成员加入、退出与更新事件增量维护。
+    同一群组同一时间只有一次拉取在进行，最多缓存 `member_cache_size` 个群组。
+    """
+
+    def __init__(self):
+        self._pools: OrderedDict[GuildKey, CandidatePool] = OrderedDict()
+        self._pending: dict[GuildKey, asyncio.Task[CandidatePool]] = {}
+
+    async def get(
+        self,
+        key: GuildKey,
+        fetch: Callable[[], AsyncIterable[Member]],
+    ) -> CandidatePool:
+        pool = self._pools.get(key)
+        if pool is not None and pool.age < config.member_cache_ttl:
+            self._pools.move_to_end(key)
+            member_cache_counter.labels("hit").inc()
+            return pool
+        if pending := self._pending.get(key):
+            member_cache_counter.labels("shared").inc()
+            return await asyncio.shield(pending)
+
+        member_cache_counter.labels("miss").inc()
+        pending = self._pending[key] = asyncio.create_task(self._fetch(key, fetch))
+        # 发起拉取的调用被取消时拉取仍继续进行，结束后才移除，避免重复拉取
+        pending.add_done_callback(lambda _: self._pending.pop(key, None))
+        return await asyncio.shield(pending)
+
+    async def _fetch(
+        self, key: GuildKey, fetch: Callable[[], AsyncIterable[Member]]
+    ) -> CandidatePool:
+        start = time.perf_counter()
+        users = [member.user async for member in fetch() if member.user is not None]
+        member_fetch_histogram.observe(time.perf_counter() - start)
+        pool = self._pools[key] = CandidatePool(users)
+        while len(self._pools) > config.member_cache_size:
+            self._pools.popitem(last=False)
+        return pool
+
+    def update(self, key: GuildKey, user: User) -> None:
+        """成员加入或资料更新"""
+        if pool := self._pools.get(key):
+            pool.update(user)
+
+    def remove(self, key: GuildKey, user_id: str) -> None:
+        """成员退出"""
+        if pool := self._pools.get(key):
+            pool.remove(user_id)
+
+    def invalidate(self, key: GuildKey | None = None) -> None:
+        if key is None:
+            self._pools.clear()
+        else:
+            self._pools.pop(key, None)
+
+
+member_cache = keeping("waifu_member_cache", obj_factory=MemberCache)
@@ -0,0 +1,24 @@
+from arclet.entari import keeping
+from prometheus_client import REGISTRY
+
+from miraita.plugins.prometheus import Counter, Histogram  # entari: plugin
+
+member_cache_counter = keeping(
+    "waifu_member_cache_counter",
+    obj_factory=lambda: Counter(
+        "miraita_waifu_member_cache",
+        "Total number of guild member lookups by cache result (hit/shared/miss)",
+        ["result"],
+    ),
+    dispose=lambda counter: REGISTRY.unregister(counter),
+)
+
+member_fetch_histogram = keeping(
+    "waifu_member_fetch_histogram",
+    obj_factory=lambda: Histogram(
+        "miraita_waifu_member_fetch_seconds",
+        "Histogram of time spent fetching all pages of a guild member list",
+        buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+    ),
+    dispose=lambda histogram: REGISTRY.unregister(histogram),
+)
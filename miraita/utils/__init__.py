@@ -0,0 +1,9 @@
+from .host import HostFacts as HostFacts
+from .host import get_host_facts as get_host_facts
+from .host import warm_host_facts as warm_host_facts
+from .image import EncodeOptions as EncodeOptions
+from .image import EncodedImage as EncodedImage
+from .image import encode_image as encode_image
+from .assets import AssetStats as AssetStats
+from .assets import AssetManager as AssetManager
+from .assets import assets as assets
@@ -0,0 +1,138 @@
+"""
+字体与图片素材管理
+
+素材在首次使用时加载，按 `(路径, 字号/模式, 修改时间)` 缓存在有界的 LRU 中，
+文件被替换后会自动重新加载。相对路径分别相对于 `FONT_DIR` 与 `IMAGE_DIR`。
+
+字体按路径交给 FreeType 加载，FreeType 会以内存映射的方式读取字体文件，
+同一字体的不同字号共享操作系统的页缓存，不会重复读入内存。
+"""
+
+from pathlib import Path
+from threading import Lock
+from dataclasses import dataclass
+from collections import OrderedDict
+from collections.abc import Iterable
+
+from PIL import Image, ImageFont
+
+from miraita.configs import FONT_DIR, IMAGE_DIR
+
+
+@dataclass(frozen=True)
+class AssetStats:
+    fonts: int
+    """已缓存的字体数量"""
+    images: int
+    """已缓存的图片数量"""
+    image_bytes: int
+    """已缓存图片解码后占用的字节数"""
+    hits: int
+    misses: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0
+
+
+def _image_nbytes(image: Image.Image) -> int:
+    return image.width * image.height * len(image.getbands())
+
+
+class AssetManager:
+    """
+    素材缓存
+
+    - 字体按数量限制，最多缓存 `max_fonts` 个 `(字体, 字号)`
+    - 图片按解码后的大小限制，总计不超过 `max_image_bytes` 字节
+
+    返回的图片是共享的缓存对象，调用方不得就地修改，需要修改时先 `copy()`。
+    可以在多个线程中同时使用。
+    """
+
+    def __init__(self, max_fonts: int = 32, max_image_bytes: int = 64 * 1024**2):
+        self.max_fonts = max_fonts
+        self.max_image_bytes = max_image_bytes
+        self._fonts: OrderedDict[tuple, ImageFont.FreeTypeFont] = OrderedDict()
+        self._images: OrderedDict[tuple, Image.Image] = OrderedDict()
+        self._image_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._lock = Lock()
+
+    @staticmethod
+    def _resolve(path: str | Path, base: Path) -> Path:
+        path = Path(path)
+        return path if path.is_absolute() else base / path
+
+    def font(self, path: str | Path, size: int) -> ImageFont.FreeTypeFont:
+        """获取 `size` 字号的字体，相对路径相对于 `FONT_DIR`"""
+        path = self._resolve(path, FONT_DIR)
+        key = (path, size, path.stat().st_mtime_ns)
+        with self._lock:
+            if (font := self._fonts.get(key)) is not None:
+                self._fonts.move_to_end(key)
+                self._hits += 1
+                return font
+            self._misses += 1
+
+        font = ImageFont.truetype(str(path), size)
+        with self._lock:
+            self._fonts[key] = font
+            while len(self._fonts) > self.max_fonts:
+                self._fonts.popitem(last=False)
+        return font
+
+    def image(self, path: str | Path, mode: str = "RGBA") -> Image.Image:
+        """获取解码并转换为 `mode` 的图片，相对路径相对于 `IMAGE_DIR`"""
+        path = self._resolve(path, IMAGE_DIR)
+        key = (path, mode, path.stat().st_mtime_ns)
+        with self._lock:
+            if (image := self._images.get(key)) is not None:
+                self._images.move_to_end(key)
+                self._hits += 1
+                return image
+            self._misses += 1
+
+        with Image.open(path) as file:
+            image = file.convert(mode) if file.mode != mode else file.copy()
+        with self._lock:
+            if key not in self._images:
+                self._images[key] = image
+                self._image_bytes += _image_nbytes(image)
+            while self._image_bytes > self.max_image_bytes and len(self._images) > 1:
+                _, evicted = self._images.popitem(last=False)
+                self._image_bytes -= _image_nbytes(evicted)
+        return image
+
+    def preload(
+        self,
+        fonts: Iterable[tuple[str | Path, int]] = (),
+        images: Iterable[str | Path] = (),
+    ) -> None:
+        """提前加载素材，适合在工作线程中调用"""
+        for path, size in fonts:
+            self.font(path, size)
+        for path in images:
+            self.image(path)
+
+    @property
+    def stats(self) -> AssetStats:
+        with self._lock:
+            return AssetStats(
+                fonts=len(self._fonts),
+                images=len(self._images),
+                image_bytes=self._image_bytes,
+                hits=self._hits,
+                misses=self._misses,
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._fonts.clear()
+            self._images.clear()
+            self._image_bytes = 0
+
+
+assets = AssetManager()
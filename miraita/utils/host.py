@@ -0,0 +1,77 @@
+"""
+主机信息
+
+CPU 型号、核心数、系统版本等在进程生命周期内不会变化的信息只采集一次。
+其中 `py-cpuinfo` 可能需要数百毫秒（部分平台还会启动子进程探测），
+可以在启动时通过 `warm_host_facts` 在工作线程中提前采集。
+"""
+
+import asyncio
+import platform
+from threading import Lock
+from dataclasses import asdict, dataclass
+
+import psutil
+import cpuinfo
+
+from arclet.entari import __version__ as __entari_version__
+
+from miraita.version import __version__ as __miraita_version__
+
+
+@dataclass(frozen=True)
+class HostFacts:
+    cpu_brand: str
+    physical_cores: int
+    """CPU 物理核心数"""
+    logical_cores: int
+    """CPU 逻辑核心数"""
+    system: str
+    release: str
+    machine: str
+    python_version: str
+    entari_version: str
+    miraita_version: str
+
+    def labels(self) -> dict[str, str]:
+        """转换为指标标签"""
+        return {key: str(value) for key, value in asdict(self).items()}
+
+
+_facts: HostFacts | None = None
+_lock = Lock()
+
+
+def _collect() -> HostFacts:
+    info = cpuinfo.get_cpu_info()
+    uname = platform.uname()
+    logical = psutil.cpu_count() or info.get("count", 0)
+    return HostFacts(
+        cpu_brand=info.get("brand_raw") or uname.processor or "unknown",
+        physical_cores=psutil.cpu_count(logical=False) or logical,
+        logical_cores=logical,
+        system=uname.system,
+        release=uname.release,
+        machine=uname.machine,
+        python_version=platform.python_version(),
+        entari_version=__entari_version__,
+        miraita_version=__miraita_version__,
+    )
+
+
+def get_host_facts() -> HostFacts:
+    """获取主机信息，首次调用时采集，之后直接返回缓存"""
+    global _facts
+
+    if _facts is None:
+        with _lock:
+            if _facts is None:
+                _facts = _collect()
+    return _facts
+
+
+async def warm_host_facts() -> HostFacts:
+    """在工作线程中采集主机信息，避免阻塞事件循环"""
+    if _facts is not None:
+        return _facts
+    return await asyncio.to_thread(get_host_facts)
@@ -0,0 +1,105 @@
+"""
+生成图片的编码
+
+按 `EncodeOptions` 将 Pillow 图片编码为 PNG（可选调色板量化）、WebP 或 JPEG，
+并可在编码前按最大宽度等比缩小。本模块只依赖 Pillow。
+"""
+
+from io import BytesIO
+from typing import Literal
+from dataclasses import dataclass
+
+from PIL import Image
+
+ImageFormat = Literal["png", "palette", "webp", "webp_lossless", "jpeg"]
+
+MIME_TYPES: dict[ImageFormat, str] = {
+    "png": "image/png",
+    "palette": "image/png",
+    "webp": "image/webp",
+    "webp_lossless": "image/webp",
+    "jpeg": "image/jpeg",
+}
+
+
+@dataclass(frozen=True)
+class EncodeOptions:
+    format: ImageFormat = "png"
+    """
+    输出格式
+
+    - `png`: 原样保存的 PNG
+    - `palette`: 量化为最多 `colors` 种颜色的调色板 PNG
+    - `webp` / `webp_lossless`: 有损 / 无损 WebP
+    - `jpeg`: 透明部分以 `background` 填充后保存的 JPEG
+    """
+    compress_level: int = 6
+    """PNG 的 zlib 压缩等级，取值范围 [0, 9]，越小编码越快、体积越大"""
+    quality: int = 85
+    """有损 WebP 与 JPEG 的质量，取值范围 [0, 100]"""
+    method: int = 4
+    """WebP 的编码速度与体积的权衡，取值范围 [0, 6]，越小编码越快"""
+    colors: int = 256
+    """`palette` 格式的颜色数"""
+    max_width: int = 0
+    """超过该宽度时等比缩小，为 0 时不缩放"""
+    background: tuple[int, int, int] = (255, 255, 255)
+    """JPEG 不支持透明通道，以该颜色填充透明部分"""
+
+    @property
+    def mime(self) -> str:
+        return MIME_TYPES[self.format]
+
+
+@dataclass(frozen=True)
+class EncodedImage:
+    data: bytes
+    mime: str
+
+
+def downscale(image: Image.Image, max_width: int) -> Image.Image:
+    """宽度超过 `max_width` 时等比缩小"""
+    if max_width <= 0 or image.width <= max_width:
+        return image
+    height = round(image.height * max_width / image.width)
+    return image.resize((max_width, height), Image.Resampling.BICUBIC, reducing_gap=2.0)
+
+
+def flatten(image: Image.Image, background: tuple[int, int, int]) -> Image.Image:
+    """将透明通道合成到纯色背景上"""
+    if image.mode not in ("RGBA", "LA", "PA"):
+        return image.convert("RGB")
+    flat = Image.new("RGB", image.size, background)
+    flat.paste(image, mask=image.getchannel("A"))
+    return flat
+
+
+def encode_image(image: Image.Image, options: EncodeOptions) -> EncodedImage:
+    image = downscale(image, options.max_width)
+    output = BytesIO()
+    match options.format:
+        case "png":
+            image.save(output, format="png", compress_level=options.compress_level)
+        case "palette":
+            image.quantize(
+                options.colors,
+                method=Image.Quantize.FASTOCTREE,
+                dither=Image.Dither.NONE,
+            ).save(output, format="png", compress_level=options.compress_level)
+        case "webp":
+            image.save(
+                output, format="webp", quality=options.quality, method=options.method
+            )
+        case "webp_lossless":
+            image.save(
+                output,
+                format="webp",
+                lossless=True,
+                quality=options.quality,
+                method=options.method,
+            )
+        case "jpeg":
+            flatten(image, options.background).save(
+                output, format="jpeg", quality=options.quality, optimize=False
+            )
+    return EncodedImage(output.getvalue(), options.mime)